@@ -8,12 +8,14 @@ Binance Data Collector – erweitert um:
   • ClickHouse-Writer (HTTP) für alle Daten inkl. 1.5s Aggregationen
 """
 
+import array
 import asyncio
 import json
 import logging
 import time
 from collections import defaultdict
 from collections import deque
+from collections import namedtuple
 from dataclasses import dataclass, field
 from statistics import median
 import math
@@ -56,6 +58,7 @@ else:
 # =============================================================================
 TOP20_SNAPSHOT_MS = int(os.getenv("TOP20_SNAPSHOT_MS", "100"))     # alle 100 ms Top-20-Snapshot
 L1_SAMPLE_MS      = int(os.getenv("L1_SAMPLE_MS", "200"))          # alle 200 ms L1/Spread/OFI
+FLUSH_YIELD_EVERY = int(os.getenv("FLUSH_YIELD_EVERY", "10"))      # Flush gibt alle N Symbole den Event-Loop frei
 
 # REST Snapshot (Orderbuch) – konservativ gedrosselt
 REST_DEPTH_LIMIT   = int(os.getenv("REST_DEPTH_LIMIT", "200"))     # 200 reicht für Top-20 sicher
@@ -78,6 +81,9 @@ CLICKHOUSE_BOOTSTRAP_DB = os.getenv("CLICKHOUSE_BOOTSTRAP_DB", "default").strip(
 TRUE_VALUES = {"1", "true", "yes", "on"}
 FALSE_VALUES = {"0", "false", "no", "off"}
 
+# Parkinson-Vorfaktor 1/(4·ln 2) – konstant, daher einmalig berechnet
+_PARK_C = 1.0 / (4.0 * math.log(2.0))
+
 
 # ============================================================================
 # ORDERBOOK
@@ -93,6 +99,9 @@ class LocalOrderbook:
         self.last_u: Optional[int] = None
         self.initialized: bool = False
         self.updates_this_window = 0
+        # Änderungszähler des Buchs; Top-20 wird nur bei Änderung neu sortiert
+        self.version: int = 0
+        self._top20_cache: Optional[Tuple[int, list, list]] = None
         # Ziel: Top-20 stabil
         self.bootstrap_min_levels = 20
         # REST-Snapshot-Guards (Limits schonend)
@@ -132,6 +141,7 @@ class LocalOrderbook:
                     self.asks = {float(p): float(q) for p, q in asks if float(q) > 0}
                     self.last_u = int(data.get("lastUpdateId", 0))
                     self.initialized = bool(self.bids and self.asks)
+                    self.version += 1
                     self._last_rest_snapshot_s = int(time.time())
                     return self.initialized
                 except Exception:
@@ -180,6 +190,7 @@ class LocalOrderbook:
 
         self.last_u = u
         self.updates_this_window += 1
+        self.version += 1
 
         # Bootstrap-Logik: wenn genug Levels vorhanden, als initialisiert markieren
         if not self.initialized:
@@ -191,11 +202,15 @@ class LocalOrderbook:
     # Snapshot-Initialisierung entfällt (nur WS)
 
     def get_top20(self) -> Tuple[List[Tuple[float, float]], List[Tuple[float, float]]]:
-        """Top-20 Levels zurückgeben"""
+        """Top-20 Levels zurückgeben (gecacht bis zur nächsten Buchänderung, Listen nicht mutieren)"""
         if not self.initialized:
             return [], []
+        cached = self._top20_cache
+        if cached is not None and cached[0] == self.version:
+            return cached[1], cached[2]
         sorted_bids = sorted(self.bids.items(), key=lambda x: x[0], reverse=True)[:20]
         sorted_asks = sorted(self.asks.items(), key=lambda x: x[0])[:20]
+        self._top20_cache = (self.version, sorted_bids, sorted_asks)
         return sorted_bids, sorted_asks
 
     def get_l1(self) -> Tuple[Optional[float], Optional[float], Optional[float], Optional[float]]:
@@ -271,6 +286,38 @@ class BookTickerL1:
     ask_qty: float = 0.0
     timestamp_ms: int = 0
 
+
+# Advanced Metrics je Symbol/Fenster – einzige Quelle der Spaltenreihenfolge in ClickHouse
+# (TABLE_COLUMNS["binance_advanced_metrics_1s5"] hängt diese Spalten an den Kontext an)
+ADVANCED_METRIC_COLUMNS: Tuple[str, ...] = (
+    "effective_spread_bps",
+    "realized_spread_5s_bps",
+    "kyle_lambda",
+    "amihud_illiq",
+    "vpin",
+    "microprice_edge_bps",
+    "qdt_bid_s",
+    "qdt_ask_s",
+    "ws_latency_p50_ms",
+    "ws_latency_p95_ms",
+    "gap_rate_depth",
+    "dup_rate_depth",
+    "ob_entropy_bid",
+    "ob_entropy_ask",
+    "variance_ratio",
+    "index_basis_bps",
+    "basis_drift_bps",
+    "funding_adj_basis_bps",
+)
+
+AdvancedMetricsRow = namedtuple("AdvancedMetricsRow", ADVANCED_METRIC_COLUMNS)
+
+
+def _build_agg_row(adv: AdvancedMetricsRow, bid_p, ask_p, mid, ts_s: float, t0: int, t1: int, sym: str) -> tuple:
+    """Zeile für binance_advanced_metrics_1s5: 7 Kontextspalten + Advanced Metrics (bereits in Spaltenreihenfolge)"""
+    return (ts_s, sym, t0, t1, bid_p or 0, ask_p or 0, mid) + adv
+
+
 # =============================================================================
 # NEU: ClickHouse-Writer (optional)
 # =============================================================================
@@ -353,15 +400,7 @@ class ClickHouseWriter:
         "binance_advanced_metrics_1s5": (
             "ts", "symbol", "window_start_ms", "window_end_ms",
             "best_bid", "best_ask", "mid",
-            "effective_spread_bps", "realized_spread_5s_bps",
-            "kyle_lambda", "amihud_illiq", "vpin",
-            "microprice_edge_bps", "qdt_bid_s", "qdt_ask_s",
-            "ws_latency_p50_ms", "ws_latency_p95_ms",
-            "gap_rate_depth", "dup_rate_depth",
-            "ob_entropy_bid", "ob_entropy_ask",
-            "variance_ratio",
-            "index_basis_bps", "basis_drift_bps", "funding_adj_basis_bps",
-        ),
+        ) + ADVANCED_METRIC_COLUMNS,
     }
 
     TABLE_DDL: Dict[str, str] = {
@@ -972,9 +1011,10 @@ class SymbolState:
         self.liq = LiqAgg()
         self.mark = MarkSnap()
         # Preisreihen innerhalb 3s
-        self.mid_prices: List[float] = []        # Midquotes (aus Depth)
-        self.trade_prices: List[float] = []      # echte Trade-Preise
-        self.trade_ts: List[int] = []            # Timestamps der Trades (ms)
+        # array.array statt list: 8 Byte je Wert statt PyFloat-Objekt (weniger GC-Druck)
+        self.mid_prices = array.array('d')       # Midquotes (aus Depth)
+        self.trade_prices = array.array('d')     # echte Trade-Preise
+        self.trade_ts = array.array('q')         # Timestamps der Trades (ms)
         # HF-Sampling
         self._last_l1_sample_ms: int = 0
         self.last_close: Optional[float] = None
@@ -1011,6 +1051,8 @@ class SymbolState:
         self.ls_ratio_top_pos: Optional[float] = None
         # Advanced microstructure state
         self.last_index_basis_bps: float = 0.0
+        # Entropie-Cache: (Buch-Version, entropy_bid, entropy_ask)
+        self.ob_entropy_cache: Optional[Tuple[int, float, float]] = None
         self.flags = {
             'has_l1': 0, 'has_trades': 0, 'has_depth': 0,
             'has_liq': 0, 'has_mark': 0, 'crossed_book': 0,
@@ -1496,7 +1538,12 @@ class Shard:
         rows_written = 0
         rows_zero = 0
 
-        for symbol in self.symbols:
+        for idx, symbol in enumerate(self.symbols):
+            # Event-Loop zwischendurch freigeben, damit WS-Frames während des Flush weiter
+            # verarbeitet werden (bereits geflushte Symbole schreiben ins neue Fenster)
+            if idx and FLUSH_YIELD_EVERY > 0 and idx % FLUSH_YIELD_EVERY == 0:
+                await asyncio.sleep(0)
+
             st = self.state[symbol]
 
             # Sync global data
@@ -1895,9 +1942,14 @@ class Shard:
         }
 
     def calc_advanced_microstructure(self, st: SymbolState, bid_p: float, ask_p: float,
-                                     bid_q: float, ask_q: float, bids_20: list, asks_20: list) -> dict:
+                                     bid_q: float, ask_q: float, bids_20: list, asks_20: list) -> AdvancedMetricsRow:
         """Calculate 10 advanced microstructure metrics"""
         mid = (bid_p + ask_p) / 2 if bid_p and ask_p else 0
+        # Microprice-Bewegung & signiertes Volumen einmalig (für Kyle & Amihud)
+        mp_ok = bool(st.microprice_first and st.microprice_last)
+        delta_mid = abs(st.microprice_last - st.microprice_first) if mp_ok else 0.0
+        signed_vol = st.trades.taker_buy_vol - st.trades.taker_sell_vol
+        vol_quote = st.trades.vol_quote
 
         # 1 & 2: Effective Spread & Realized Spread (5s look-ahead)
         effective_spread_bps = 0.0
@@ -1922,17 +1974,13 @@ class Shard:
 
         # 3: Kyle Lambda (price impact coefficient)
         kyle_lambda = 0.0
-        if st.microprice_first and st.microprice_last and st.trades.vol_quote > 0:
-            delta_mid = abs(st.microprice_last - st.microprice_first)
-            signed_vol = st.trades.taker_buy_vol - st.trades.taker_sell_vol
-            if abs(signed_vol) > 1e-6:
-                kyle_lambda = delta_mid / abs(signed_vol)
+        if mp_ok and vol_quote > 0 and abs(signed_vol) > 1e-6:
+            kyle_lambda = delta_mid / abs(signed_vol)
 
         # 4: Amihud Illiquidity
         amihud_illiq = 0.0
-        if st.microprice_first and st.microprice_last and st.trades.vol_quote > 1e-6:
-            delta_mid = abs(st.microprice_last - st.microprice_first)
-            amihud_illiq = delta_mid / st.trades.vol_quote
+        if mp_ok and vol_quote > 1e-6:
+            amihud_illiq = delta_mid / vol_quote
 
         # 5: VPIN (simplified - volume-synchronized probability of informed trading)
         vpin = 0.0
@@ -1970,8 +2018,14 @@ class Shard:
             probs = [q / total for q in qtys if q > 0]
             return -sum(p * math.log(p) for p in probs if p > 0)
 
-        ob_entropy_bid = calc_entropy([q for _, q in bids_20[:20]])
-        ob_entropy_ask = calc_entropy([q for _, q in asks_20[:20]])
+        # Unverändertes Buch (idle Symbol) → Entropie aus dem Vorfenster übernehmen
+        cached = st.ob_entropy_cache
+        if cached is not None and cached[0] == st.ob.version:
+            ob_entropy_bid, ob_entropy_ask = cached[1], cached[2]
+        else:
+            ob_entropy_bid = calc_entropy([q for _, q in bids_20[:20]])
+            ob_entropy_ask = calc_entropy([q for _, q in asks_20[:20]])
+            st.ob_entropy_cache = (st.ob.version, ob_entropy_bid, ob_entropy_ask)
 
         # 15: Variance Ratio (200ms -> 1.5s)
         variance_ratio = 1.0  # Default to 1 (random walk)
@@ -1992,26 +2046,26 @@ class Shard:
                 hours_to_funding = (st.mark.next_funding_ms - int(time.time() * 1000)) / 3600000
                 funding_adj_basis_bps = index_basis_bps - (st.mark.funding_rate * 10000 * hours_to_funding / 8)
 
-        return {
-            'effective_spread_bps': effective_spread_bps,
-            'realized_spread_5s_bps': realized_spread_5s_bps,
-            'kyle_lambda': kyle_lambda,
-            'amihud_illiq': amihud_illiq,
-            'vpin': vpin,
-            'microprice_edge_bps': microprice_edge_bps,
-            'qdt_bid_s': qdt_bid_s,
-            'qdt_ask_s': qdt_ask_s,
-            'ws_latency_p50_ms': ws_latency_p50_ms,
-            'ws_latency_p95_ms': ws_latency_p95_ms,
-            'gap_rate_depth': gap_rate_depth,
-            'dup_rate_depth': dup_rate_depth,
-            'ob_entropy_bid': ob_entropy_bid,
-            'ob_entropy_ask': ob_entropy_ask,
-            'variance_ratio': variance_ratio,
-            'index_basis_bps': index_basis_bps,
-            'basis_drift_bps': basis_drift_bps,
-            'funding_adj_basis_bps': funding_adj_basis_bps,
-        }
+        return AdvancedMetricsRow(
+            effective_spread_bps=effective_spread_bps,
+            realized_spread_5s_bps=realized_spread_5s_bps,
+            kyle_lambda=kyle_lambda,
+            amihud_illiq=amihud_illiq,
+            vpin=vpin,
+            microprice_edge_bps=microprice_edge_bps,
+            qdt_bid_s=qdt_bid_s,
+            qdt_ask_s=qdt_ask_s,
+            ws_latency_p50_ms=ws_latency_p50_ms,
+            ws_latency_p95_ms=ws_latency_p95_ms,
+            gap_rate_depth=gap_rate_depth,
+            dup_rate_depth=dup_rate_depth,
+            ob_entropy_bid=ob_entropy_bid,
+            ob_entropy_ask=ob_entropy_ask,
+            variance_ratio=variance_ratio,
+            index_basis_bps=index_basis_bps,
+            basis_drift_bps=basis_drift_bps,
+            funding_adj_basis_bps=funding_adj_basis_bps,
+        )
 
     def update_minute_parkinson(self, st: SymbolState, ohlc: dict, now_ms: int):
         """Aggregiere 3s-High/Low zu 1m-High/Low und berechne Parkinson-Vol je Minute"""
@@ -2025,7 +2079,7 @@ class Shard:
             # Minute geschlossen → Parkinson aus alter Minute
             if st.min_low > 0 and st.min_high > st.min_low:
                 ratio = st.min_high / st.min_low
-                st.parkinson_last = math.sqrt(max(0.0, (1.0 / (4.0 * math.log(2))) * (math.log(ratio) ** 2)))
+                st.parkinson_last = math.sqrt(max(0.0, _PARK_C * (math.log(ratio) ** 2)))
             # Neue Minute starten
             st.min_bucket_start = bucket
             st.min_high = high
@@ -2038,7 +2092,7 @@ class Shard:
                   bid_p: float, bid_q: float, ask_p: float, ask_q: float,
                   ohlc: dict, trade_metrics: dict, liq_metrics: dict,
                   mark_metrics: dict, ob_metrics: dict, flow_metrics: dict,
-                  vol_metrics: dict, advanced_metrics: dict, bids_20: list, asks_20: list, st: SymbolState):
+                  vol_metrics: dict, advanced_metrics: AdvancedMetricsRow, bids_20: list, asks_20: list, st: SymbolState):
         """Send 1.5s advanced metrics to ClickHouse"""
 
         if not self.ch.enabled:
@@ -2048,35 +2102,9 @@ class Shard:
         mid = (bid_p + ask_p) / 2 if bid_p and ask_p else 0
 
         # Build tuple for ClickHouse - only advanced metrics + context
-        row = (
-            self.win_start / 1000.0,  # ts as seconds (will be converted to DateTime64)
-            symbol,
-            self.win_start,
-            self.win_start + 1500,
-            # Context
-            bid_p or 0,
-            ask_p or 0,
-            mid,
-            # Advanced metrics only
-            advanced_metrics.get('effective_spread_bps', 0),
-            advanced_metrics.get('realized_spread_5s_bps', 0),
-            advanced_metrics.get('kyle_lambda', 0),
-            advanced_metrics.get('amihud_illiq', 0),
-            advanced_metrics.get('vpin', 0),
-            advanced_metrics.get('microprice_edge_bps', 0),
-            advanced_metrics.get('qdt_bid_s', 0),
-            advanced_metrics.get('qdt_ask_s', 0),
-            advanced_metrics.get('ws_latency_p50_ms', 0),
-            advanced_metrics.get('ws_latency_p95_ms', 0),
-            advanced_metrics.get('gap_rate_depth', 0),
-            advanced_metrics.get('dup_rate_depth', 0),
-            advanced_metrics.get('ob_entropy_bid', 0),
-            advanced_metrics.get('ob_entropy_ask', 0),
-            advanced_metrics.get('variance_ratio', 1.0),
-            advanced_metrics.get('index_basis_bps', 0),
-            advanced_metrics.get('basis_drift_bps', 0),
-            advanced_metrics.get('funding_adj_basis_bps', 0),
-        )
+        row = _build_agg_row(advanced_metrics, bid_p, ask_p, mid,
+                             self.win_start / 1000.0,  # ts as seconds (will be converted to DateTime64)
+                             self.win_start, self.win_start + 1500, symbol)
 
         # Add to ClickHouse queue
         self.ch._q_agg.append(row)
@@ -2085,9 +2113,10 @@ class Shard:
         """Reset State für neues Fenster"""
         st.trades = TradeAgg()
         st.liq = LiqAgg()
-        st.mid_prices.clear()
-        st.trade_prices.clear()
-        st.trade_ts.clear()
+        # array.array hat (vor 3.13) kein clear()
+        del st.mid_prices[:]
+        del st.trade_prices[:]
+        del st.trade_ts[:]
         st.ofi_sum = 0.0
         st.microprice_first = None
         st.microprice_last = None
@@ -2130,7 +2159,7 @@ class RestScheduler:
         # Steuerung
         self.is_running = True
         # sanfte Limits
-        self._sem_oi = asyncio.Semaphore(50)     # max parallel OI-Calls
+        self._oi_workers = 50                    # max parallel OI-Calls (Worker-Coroutinen)
         self._sem_ls = asyncio.Semaphore(32)     # max parallel L/S-Calls (konservativ, aber flotter)
         self._ls_budget_per_min = 190            # knapp unter 200/min IP-Limit
         self._ls_tokens = self._ls_budget_per_min
@@ -2150,60 +2179,73 @@ class RestScheduler:
     async def _loop_open_interest(self):
         """
         Round-Robin über alle Symbole, Ziel ~30s pro Symbol.
-        Pro Tick holen wir so viele Symbole wie budgetiert (ohne aggressiv zu werden).
+        Producer taktet die Symbole gleichmäßig in eine Queue, feste Worker holen sie ab.
+        Langsame Antworten blockieren so nicht die nächste Sekunde (kein Head-of-Line-Blocking).
         """
-        idx = 0
         n = len(self.symbols)
+        if n == 0:
+            return
         # Zielrate: alle Symbole in oi_interval Sekunden ⇒ ~ n/oi_interval Calls pro Sek.
-        # Wir takten in 1s-Schritten.
-        while self.is_running:
-            start = time.time()
-            if n == 0:
-                await asyncio.sleep(1.0)
-                continue
-            per_sec = max(1, n // self.oi_interval)  # grobe Zielrate
-            batch = []
-            for _ in range(per_sec):
+        per_sec = max(1, n // self.oi_interval)  # grobe Zielrate
+        step = 1.0 / per_sec
+        queue: asyncio.Queue = asyncio.Queue(maxsize=per_sec * 3)
+        workers = [asyncio.create_task(self._oi_worker(queue)) for _ in range(self._oi_workers)]
+        try:
+            idx = 0
+            next_at = time.monotonic()
+            while self.is_running:
                 sym = self.symbols[idx % n]; idx += 1
-                batch.append(self._fetch_open_interest_async(sym))
-            if batch:
-                await asyncio.gather(*batch, return_exceptions=True)
-            # Rest der Sekunde schlafen
-            elapsed = time.time() - start
-            await asyncio.sleep(max(0.0, 1.0 - elapsed))
+                # volle Queue = Worker hängen → Producer bremst (Backpressure)
+                await queue.put(sym)
+                next_at += step
+                now = time.monotonic()
+                if next_at < now:
+                    next_at = now  # nach Stau nicht im Burst nachholen
+                await asyncio.sleep(next_at - now)
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
 
-    async def _fetch_open_interest_async(self, symbol: str):
-        async with self._sem_oi:
+    async def _oi_worker(self, queue: asyncio.Queue):
+        while True:
+            sym = await queue.get()
             try:
-                assert self.session is not None
-                url = "https://fapi.binance.com/fapi/v1/openInterest"
-                async with self.session.get(url, params={"symbol": symbol}) as resp:
-                    if resp.status == 429:
-                        self.logger.debug("OI 429")
-                        return
-                    resp.raise_for_status()
-                    data = await resp.json()
-                now_ms = int(time.time() * 1000)
-                oi = float(data.get("openInterest", 0) or 0)
-                # Berechne OI Value: Brauchen Mark Price dafür
-                # Hole Mark Price aus global_streams Cache (über separate Referenz)
-                # ODER: hole es aus dem mark_data des GlobalStreams
-                # Problem: Wir haben hier keinen Zugriff auf GlobalStreams
-                # Lösung: Wir cachen mark_price separat oder berechnen es später beim Mapping
-                # Für jetzt: setzen wir es auf None und berechnen beim sync_rest_window_data
-                oi_val = None  # wird später berechnet
-                self._oi[symbol] = {"ts": now_ms, "openInterest": oi, "openInterestValue": oi_val}
+                await self._fetch_open_interest_async(sym)
+            finally:
+                queue.task_done()
 
-                # ClickHouse Writer
-                if self.ch_writer and self.ch_writer.enabled:
-                    self.ch_writer.add_open_interest(
-                        ts_ms=now_ms,
-                        symbol=symbol,
-                        open_interest=oi,
-                        open_interest_value=oi_val if oi_val is not None else 0.0,
-                    )
-            except Exception as e:
-                self.logger.debug(f"OI fetch failed {symbol}: {e}")
+    async def _fetch_open_interest_async(self, symbol: str):
+        try:
+            assert self.session is not None
+            url = "https://fapi.binance.com/fapi/v1/openInterest"
+            async with self.session.get(url, params={"symbol": symbol}) as resp:
+                if resp.status == 429:
+                    self.logger.debug("OI 429")
+                    return
+                resp.raise_for_status()
+                data = await resp.json()
+            now_ms = int(time.time() * 1000)
+            oi = float(data.get("openInterest", 0) or 0)
+            # Berechne OI Value: Brauchen Mark Price dafür
+            # Hole Mark Price aus global_streams Cache (über separate Referenz)
+            # ODER: hole es aus dem mark_data des GlobalStreams
+            # Problem: Wir haben hier keinen Zugriff auf GlobalStreams
+            # Lösung: Wir cachen mark_price separat oder berechnen es später beim Mapping
+            # Für jetzt: setzen wir es auf None und berechnen beim sync_rest_window_data
+            oi_val = None  # wird später berechnet
+            self._oi[symbol] = {"ts": now_ms, "openInterest": oi, "openInterestValue": oi_val}
+
+            # ClickHouse Writer
+            if self.ch_writer and self.ch_writer.enabled:
+                self.ch_writer.add_open_interest(
+                    ts_ms=now_ms,
+                    symbol=symbol,
+                    open_interest=oi,
+                    open_interest_value=oi_val if oi_val is not None else 0.0,
+                )
+        except Exception as e:
+            self.logger.debug(f"OI fetch failed {symbol}: {e}")
 
     def get_latest_oi(self, symbol: str) -> Optional[dict]:
         return self._oi.get(symbol)
@@ -2301,15 +2343,15 @@ def get_all_symbols() -> list:
         resp.raise_for_status()
         data = resp.json()
 
-        symbols = []
-        for item in data['symbols']:
-            if (item['status'] == 'TRADING' and
-                item['contractType'] == 'PERPETUAL' and
-                item['symbol'].endswith('USDT')):
-                symbols.append(item['symbol'])
+        symbols = sorted(
+            item['symbol'] for item in data['symbols']
+            if item['status'] == 'TRADING'
+            and item['contractType'] == 'PERPETUAL'
+            and item['symbol'].endswith('USDT')
+        )
 
         logging.info(f"Loaded {len(symbols)} USDT Perpetual symbols")
-        return sorted(symbols)
+        return symbols
 
     except Exception as e:
         logging.error(f"Failed to fetch symbols: {e}")
@@ -1,35 +1,23 @@
 from __future__ import annotations
 
 import argparse
+import heapq
+import io
+import itertools
 import os
+import sys
+import time
 from dataclasses import dataclass
-from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 from pathlib import Path
 from urllib.parse import urlparse
 
-try:
-    import clickhouse_connect
-except ImportError as exc:  # pragma: no cover
-    raise SystemExit(
-        "Das Paket 'clickhouse-connect' fehlt. Bitte mit 'pip install clickhouse-connect' installieren."
-    ) from exc
-
-
-try:
-    # Erlaubt das Laden der Feed-Konfiguration ohne Installation als Paket.
-    if __package__ in (None, ""):
-        import sys
-        from pathlib import Path
-
-        sys.path.append(str(Path(__file__).resolve().parent))
-    from feeds.config import load_config
-except Exception:  # pragma: no cover
-    load_config = None  # type: ignore
-
 
 DEFAULT_TABLES = [
     "advanced_metrics",
     "agg_trades_5s",
+    "agg_trades_rollup",
     "funding",
     "klines",
     "l1",
@@ -43,6 +31,20 @@ DEFAULT_TABLES = [
 
 MAX_DISPLAY_ROWS = 50
 
+# Metadaten (Datenbank-/Tabellenlisten) werden kurz gecacht, damit Menüaktionen
+# nicht jedes Mal system.tables abfragen. Key: Datenbankname (None = Datenbankliste).
+META_CACHE_TTL_S = 30.0
+_META_CACHE: Dict[Optional[str], Tuple[float, List[str]]] = {}
+# Zeiteinheit von ts_event_ns (ns/ms) je (db, table) – praktisch invariant
+DIVISOR_CACHE_TTL_S = 60.0
+_DIVISOR_CACHE: Dict[Tuple[str, str], Tuple[float, Tuple[int, str]]] = {}
+# Ob die Tabelle eine materialisierte sec-Spalte hat (--ensure-sec-column), gleiche TTL
+_SEC_COLUMN_CACHE: Dict[Tuple[str, str], Tuple[float, bool]] = {}
+# Vorberechnete (tbl, sec, instrument)-Zeilen für die Vollständigkeits-Checks (--ensure-rollup)
+ROLLUP_TABLE = "completeness_rollup"
+# Serverseitiger Query-Cache für die Vollständigkeits-Checks (Sekunden)
+QUERY_CACHE_TTL_S = 10
+
 
 @dataclass
 class Settings:
@@ -52,6 +54,7 @@ class Settings:
     user: str
     password: str
     secure: bool = False
+    exact_counts: bool = False
 
 
 def parse_args() -> argparse.Namespace:
@@ -63,42 +66,98 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--user", help="Benutzername.")
     parser.add_argument("--password", help="Passwort.")
     parser.add_argument("--secure", action="store_true", help="HTTPS verwenden.")
+    parser.add_argument(
+        "--exact",
+        action="store_true",
+        help="Vollständigkeits-Checks mit uniqExact statt uniq zählen (langsamer, deterministisch).",
+    )
+    parser.add_argument(
+        "--ensure-rollup",
+        action="store_true",
+        help="Rollup-Tabelle + Materialized Views für die Vollständigkeits-Checks anlegen.",
+    )
+    parser.add_argument(
+        "--ensure-sec-column",
+        action="store_true",
+        help="Materialisierte sec-Spalte + minmax-Index auf den Check-Tabellen anlegen.",
+    )
     return parser.parse_args()
 
 
 def resolve_settings(args: argparse.Namespace) -> Settings:
-    host = args.host or os.getenv("CLICKHOUSE_HOST", "localhost")
-    port = args.port or int(os.getenv("CLICKHOUSE_PORT", "8123"))
-    database = args.database or os.getenv("CLICKHOUSE_DB", "marketdata")
-    user = args.user or os.getenv("CLICKHOUSE_USER", "default")
-    password = args.password or os.getenv("CLICKHOUSE_PASSWORD", "")
+    # Explizit per CLI/Env gesetzte Werte; None = nicht angegeben
+    env_port = os.getenv("CLICKHOUSE_PORT")
+    host = args.host or os.getenv("CLICKHOUSE_HOST")
+    port = args.port or (int(env_port) if env_port else None)
+    database = args.database or os.getenv("CLICKHOUSE_DB")
+    user = args.user or os.getenv("CLICKHOUSE_USER")
+    password = args.password if args.password is not None else os.getenv("CLICKHOUSE_PASSWORD")
     secure = bool(args.secure or os.getenv("CLICKHOUSE_SECURE"))
 
+    # feeds.yml nur überspringen, wenn alle Verbindungswerte explizit gesetzt sind –
+    # sonst liefert die DSN Port/User/Passwort und CLI/Env überschreiben sie
     config_path = args.config
-    if not config_path and Path("feeds/feeds.yml").exists():
-        config_path = "feeds/feeds.yml"
-
-    if config_path and load_config:
-        config = load_config(config_path)
+    explicit = None not in (host, port, database, user, password)
+    if not config_path and not explicit:
+        default_path = Path("feeds/feeds.yml")
+        if default_path.exists():
+            config_path = str(default_path)
+
+    config = _load_feed_config(config_path) if config_path else None
+    if config is not None:
         defaults = config.defaults.clickhouse
         parsed = urlparse(str(defaults.dsn))
-        if parsed.hostname:
-            host = parsed.hostname
-        if parsed.port:
-            port = parsed.port
-        if parsed.username:
-            user = parsed.username
-        if parsed.password:
+        host = host or parsed.hostname
+        port = port or parsed.port
+        user = user or parsed.username
+        if password is None:
             password = parsed.password
         if parsed.scheme == "https":
             secure = True
-        database = defaults.database or database
+        database = database or defaults.database
+
+    return Settings(
+        host=host or "localhost",
+        port=port or 8123,
+        database=database or "marketdata",
+        user=user or "default",
+        password=password or "",
+        secure=secure,
+        exact_counts=args.exact,
+    )
+
+
+def _load_feed_config(config_path: str):
+    """feeds.config erst bei Bedarf importieren – zieht YAML + pydantic nach sich."""
+    try:
+        # Erlaubt das Laden der Feed-Konfiguration ohne Installation als Paket.
+        if __package__ in (None, ""):
+            sys.path.append(str(Path(__file__).resolve().parent))
+        from feeds.config import load_config
+    except Exception:  # pragma: no cover
+        return None
+    return load_config(config_path)
+
 
-    return Settings(host=host, port=port, database=database, user=user, password=password, secure=secure)
+_POOL_MGR = None
 
 
 def get_client(settings: Settings, database: str | None = None):
+    global _POOL_MGR
+    # Erst hier importieren: --help und Argument-Fehler brauchen den Treiber nicht
+    try:
+        import clickhouse_connect
+        from clickhouse_connect.driver.httputil import get_pool_manager
+    except ImportError as exc:  # pragma: no cover
+        raise SystemExit(
+            "Das Paket 'clickhouse-connect' fehlt. Bitte mit 'pip install clickhouse-connect' installieren."
+        ) from exc
+
     db = database or settings.database
+    if _POOL_MGR is None:
+        # Ein Pool für alle Clients: beim DB-Wechsel wird nur der Client neu gebaut,
+        # die Keep-Alive-Verbindungen bleiben erhalten. Der Inspector ist single-threaded.
+        _POOL_MGR = get_pool_manager(maxsize=4)
     return clickhouse_connect.get_client(
         host=settings.host,
         port=settings.port,
@@ -106,12 +165,41 @@ def get_client(settings: Settings, database: str | None = None):
         password=settings.password,
         secure=settings.secure,
         database=db,
+        compress="lz4",
+        query_limit=0,
+        pool_mgr=_POOL_MGR,
     )
 
 
+def _cached_meta(key: Optional[str], loader: Callable[[], List[str]]) -> List[str]:
+    now = time.monotonic()
+    hit = _META_CACHE.get(key)
+    if hit is not None and now - hit[0] < META_CACHE_TTL_S:
+        return hit[1]
+    value = loader()
+    _META_CACHE[key] = (now, value)
+    return value
+
+
+def invalidate_meta_cache(database: Optional[str] = None) -> None:
+    """Ohne Argument alles verwerfen, sonst nur die Tabellenliste der Datenbank."""
+    if database is None:
+        _META_CACHE.clear()
+        _DIVISOR_CACHE.clear()
+        _SEC_COLUMN_CACHE.clear()
+    else:
+        _META_CACHE.pop(database, None)
+        for cache in (_DIVISOR_CACHE, _SEC_COLUMN_CACHE):
+            for key in [key for key in cache if key[0] == database]:
+                del cache[key]
+
+
 def fetch_databases(client) -> List[str]:
-    result = client.query("SELECT name FROM system.databases ORDER BY name")
-    return [row[0] for row in result.result_rows]
+    def load() -> List[str]:
+        result = client.query("SELECT name FROM system.databases ORDER BY name")
+        return [row[0] for row in result.result_rows]
+
+    return _cached_meta(None, load)
 
 
 def list_databases(client, _settings: Settings, current_db: str) -> None:
@@ -144,6 +232,7 @@ def switch_database(client, settings: Settings, current_db: str) -> str:
         print("Ungültige Auswahl.")
         return current_db
 
+    invalidate_meta_cache()
     return current_db
 
 
@@ -154,8 +243,17 @@ def fetch_tables(client, database: str) -> List[str]:
         WHERE database = %(db)s
         ORDER BY name
     """
-    result = client.query(query, parameters={"db": database})
-    return [row[0] for row in result.result_rows]
+
+    def load() -> List[str]:
+        result = client.query(query, parameters={"db": database})
+        return [row[0] for row in result.result_rows]
+
+    return _cached_meta(database, load)
+
+
+def refresh_metadata(client, settings: Settings, current_db: str) -> None:
+    invalidate_meta_cache()
+    print("Metadaten-Cache geleert.")
 
 
 def list_tables(client, settings: Settings, current_db: str) -> None:
@@ -173,19 +271,28 @@ def describe_table(client, settings: Settings, current_db: str) -> None:
     table = prompt_table_name(client, current_db)
     if not table:
         return
-    result = client.query(f"DESCRIBE TABLE {current_db}.{table}")
-    print_rows(result.column_names, result.result_rows)
+    print_query(
+        client,
+        "DESCRIBE TABLE {db:Identifier}.{table:Identifier}",
+        {"db": current_db, "table": table},
+    )
 
 
 def view_data(client, settings: Settings, current_db: str) -> None:
     table = prompt_table_name(client, current_db)
     if not table:
         return
-    limit = input("LIMIT (Standard 20): ").strip()
-    limit = limit or "20"
-    query = f"SELECT * FROM {current_db}.{table} LIMIT {limit}"
-    result = client.query(query)
-    print_rows(result.column_names, result.result_rows)
+    try:
+        limit_raw = input("LIMIT (Standard 20): ").strip()
+        limit = int(limit_raw) if limit_raw else 20
+    except ValueError:
+        print("Ungueltige Eingabe.")
+        return
+    print_query(
+        client,
+        "SELECT * FROM {db:Identifier}.{table:Identifier} LIMIT {limit:UInt64}",
+        {"db": current_db, "table": table, "limit": limit},
+    )
 
 
 def count_rows(client, settings: Settings, current_db: str) -> None:
@@ -193,13 +300,47 @@ def count_rows(client, settings: Settings, current_db: str) -> None:
     if not tables:
         print("Keine Tabellen.")
         return
+    # MergeTree führt total_rows/total_bytes als Metadaten → kein Scan nötig
+    result = client.query(
+        """
+        SELECT name, total_rows, total_bytes
+        FROM system.tables
+        WHERE database = %(db)s AND name IN %(names)s
+        """,
+        parameters={"db": current_db, "names": tuple(tables)},
+    )
+    meta = {name: (total_rows, total_bytes) for name, total_rows, total_bytes in result.result_rows}
+    # Engines ohne total_rows (Views, Log, ...) per count() nachzählen – gebündelt in einem Query
+    missing = [table for table in tables if meta.get(table, (None, None))[0] is None]
+    counts = _count_rows_union(client, current_db, missing)
     rows = []
     for table in tables:
-        result = client.query(
-            "SELECT count() FROM {db}.{table}".format(db=current_db, table=table)
-        )
-        rows.append((table, result.result_rows[0][0]))
-    print_rows(["table", "rows"], rows)
+        total_rows, total_bytes = meta.get(table, (None, None))
+        if total_rows is None:
+            total_rows = counts.get(table, 0)
+        rows.append((table, total_rows, total_bytes))
+    print_rows(["table", "rows", "bytes"], rows)
+
+
+def _quote_ident(name: str) -> str:
+    return "`" + name.replace("\\", "\\\\").replace("`", "\\`") + "`"
+
+
+def _quote_str(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def _count_rows_union(client, database: str, tables: Sequence[str]) -> Dict[str, int]:
+    """count() für mehrere Tabellen in einem Roundtrip (UNION ALL)."""
+    if not tables:
+        return {}
+    db = _quote_ident(database)
+    query = " UNION ALL ".join(
+        f"SELECT {_quote_str(table)} AS name, count() AS rows FROM {db}.{_quote_ident(table)}"
+        for table in tables
+    )
+    result = client.query(query)
+    return {table: rows for table, rows in result.result_rows}
 
 
 def run_custom_sql(client, settings: Settings, current_db: str) -> None:
@@ -215,14 +356,13 @@ def run_custom_sql(client, settings: Settings, current_db: str) -> None:
         return
     query = "\n".join(lines)
     try:
-        result = client.query(query)
+        print_query(client, query, empty_message="Abfrage erfolgreich, keine Zeilen zurückgegeben.")
     except Exception as exc:  # pylint: disable=broad-except
         print(f"Fehler: {exc}")
         return
-    if result.result_rows:
-        print_rows(result.column_names, result.result_rows)
-    else:
-        print("Abfrage erfolgreich, keine Zeilen zurückgegeben.")
+    finally:
+        # Eigenes SQL kann DDL enthalten → Metadaten neu laden
+        invalidate_meta_cache()
 
 
 def drop_table(client, settings: Settings, current_db: str) -> None:
@@ -233,526 +373,400 @@ def drop_table(client, settings: Settings, current_db: str) -> None:
     if confirm != "yes":
         print("Abgebrochen.")
         return
-    client.command(f"DROP TABLE {current_db}.{table}")
+    client.command(f"DROP TABLE {_quote_ident(current_db)}.{_quote_ident(table)}")
+    invalidate_meta_cache(current_db)
     print("Tabelle gelöscht.")
 
 
 def _detect_time_divisor(client, current_db: str, table: str) -> tuple[int, str]:
-    result = client.query(f"SELECT max(ts_event_ns) FROM {current_db}.{table}")
-    max_ts = result.result_rows[0][0]
-    if max_ts is None:
-        return 1_000_000_000, "ns"
+    # Leere Tabelle: ns annehmen – für Lese-Checks unkritisch, es gibt ohnehin keine Zeilen
+    return _probe_time_divisor(client, current_db, table) or (1_000_000_000, "ns")
+
+
+def _probe_time_divisor(client, current_db: str, table: str) -> Optional[tuple[int, str]]:
+    """Zeiteinheit von ts_event_ns (ns/ms) oder None, solange die Tabelle leer ist."""
+    key = (current_db, table)
+    now = time.monotonic()
+    hit = _DIVISOR_CACHE.get(key)
+    if hit is not None and now - hit[0] < DIVISOR_CACHE_TTL_S:
+        return hit[1]
+    # max() statt einer beliebigen Zeile: eine einzelne Alt- oder Fehlzeile (ms, 0) würde
+    # sonst die Einheit für die ganze Tabelle festlegen; das Ergebnis wird ohnehin gecacht
+    result = client.query(
+        "SELECT max(ts_event_ns) FROM {db:Identifier}.{table:Identifier}",
+        parameters={"db": current_db, "table": table},
+    )
+    max_ts = result.result_rows[0][0] if result.result_rows else None
+    if not max_ts:
+        # leere Tabellen nicht cachen, die Einheit steht dann noch nicht fest
+        return None
     if max_ts >= 1_000_000_000_000_000:
-        return 1_000_000_000, "ns"
-    return 1000, "ms"
-
-
-def _check_per_second_completeness(
-    client,
-    current_db: str,
-    *,
-    table: str,
-    title: str,
-) -> None:
-    print(f"\n{title}")
-    minutes_raw = input("Zeitraum in Minuten (Default 10, 'all' fuer alles): ").strip().lower()
-    if minutes_raw in {"", "10"}:
-        minutes = 10
-    elif minutes_raw == "all":
-        minutes = None
-    elif minutes_raw.isdigit():
-        minutes = int(minutes_raw)
+        detected = (1_000_000_000, "ns")
     else:
-        print("Ungueltige Eingabe.")
-        return
-
-    divisor, unit = _detect_time_divisor(client, current_db, table)
-    bounds = client.query(
-        "SELECT min(toUInt32(ts_event_ns/{div})) AS min_sec, "
-        "max(toUInt32(ts_event_ns/{div})) AS max_sec "
-        "FROM {db}.{table}".format(db=current_db, table=table, div=divisor)
+        detected = (1000, "ms")
+    _DIVISOR_CACHE[key] = (now, detected)
+    return detected
+
+
+def _has_sec_column(client, current_db: str, table: str) -> bool:
+    key = (current_db, table)
+    now = time.monotonic()
+    hit = _SEC_COLUMN_CACHE.get(key)
+    if hit is not None and now - hit[0] < DIVISOR_CACHE_TTL_S:
+        return hit[1]
+    result = client.query(
+        """
+        SELECT count()
+        FROM system.columns
+        WHERE database = %(db)s AND table = %(table)s AND name = 'sec'
+        """,
+        parameters={"db": current_db, "table": table},
     )
-    min_sec, max_sec = bounds.result_rows[0]
-    if min_sec is None or max_sec is None:
-        print(f"Keine Daten in {table}.")
-        return
+    present = bool(result.result_rows[0][0])
+    _SEC_COLUMN_CACHE[key] = (now, present)
+    return present
 
-    if minutes is None:
-        start_sec = int(min_sec)
-    else:
-        start_sec = max(int(min_sec), int(max_sec) - minutes * 60 + 1)
-    end_sec = int(max_sec)
 
-    expected = client.query(
-        "SELECT countDistinct(instrument) FROM {db}.{table} "
-        "WHERE toUInt32(ts_event_ns/{div}) BETWEEN %(start)s AND %(end)s".format(
-            db=current_db, table=table, div=divisor
-        ),
-        parameters={"start": start_sec, "end": end_sec},
-    )
-    expected_symbols = expected.result_rows[0][0]
-    if not expected_symbols:
-        print("Keine Symbole im gewaehlten Zeitraum.")
-        return
+def _read_settings(client) -> Dict[str, object]:
+    """Query-Cache für lesende Checks (ab ClickHouse 23.1); kurze TTL, da laufend Daten einfließen."""
+    if client.min_version("23.1"):
+        return {"use_query_cache": 1, "query_cache_ttl": QUERY_CACHE_TTL_S}
+    return {}
 
-    summary = client.query(
-        """
-        WITH
-          %(start)s AS start_sec,
-          %(end)s AS end_sec,
-          %(expected)s AS expected_symbols
-        SELECT
-          sum(missing) AS missing_total,
-          countIf(missing > 0) AS seconds_with_missing,
-          max(missing) AS max_missing
-        FROM (
-          SELECT
-            sec,
-            expected_symbols - ifNull(actual_symbols, 0) AS missing
-          FROM
-            (SELECT arrayJoin(range(start_sec, end_sec + 1)) AS sec) AS timeline
-          LEFT JOIN
-            (
-              SELECT
-                toUInt32(ts_event_ns/{div}) AS sec,
-                countDistinct(instrument) AS actual_symbols
-              FROM {db}.{table}
-              WHERE sec BETWEEN start_sec AND end_sec
-              GROUP BY sec
-            ) AS actual USING sec
-        )
-        """.format(db=current_db, table=table, div=divisor),
-        parameters={"start": start_sec, "end": end_sec, "expected": expected_symbols},
-    )
-    missing_total, seconds_with_missing, max_missing = summary.result_rows[0]
 
-    print(
-        f"Zeitraum: {start_sec}..{end_sec} (Sekunden, ts_event in {unit}), Symbole: {expected_symbols}\n"
-        f"Fehlende Eintraege gesamt: {missing_total}, "
-        f"Sekunden mit Luecken: {seconds_with_missing}, "
-        f"Max fehlend in Sekunde: {max_missing}"
+def _prompt_window_minutes() -> Optional[int]:
+    """Prüfzeitraum in Minuten abfragen: 0 = alles, None = ungültige Eingabe."""
+    minutes_raw = input("Zeitraum in Minuten (Default 10, 'all' fuer alles): ").strip().lower()
+    if minutes_raw == "":
+        return 10
+    if minutes_raw == "all":
+        return 0
+    if minutes_raw.isdigit() and int(minutes_raw) > 0:
+        return int(minutes_raw)
+    return None
+
+
+@dataclass(frozen=True)
+class CompletenessCheck:
+    table: str
+    title: str
+    bucket_s: int = 1
+    bucket_label: str = "Sekunden"
+    bucket_unit: str = "Sekunde"
+    where_sql: str = ""
+
+
+COMPLETENESS_CHECKS: Dict[str, CompletenessCheck] = {
+    check.table: check
+    for check in (
+        CompletenessCheck("mark_price", "Mark-Price Vollstaendigkeit (1 Zeile pro Symbol pro Sekunde)"),
+        CompletenessCheck("funding", "Funding Vollstaendigkeit (1 Zeile pro Symbol pro Sekunde)"),
+        CompletenessCheck("ob_top5", "OB Top5 Vollstaendigkeit (1 Zeile pro Symbol pro Sekunde)"),
+        CompletenessCheck(
+            "klines",
+            "Klines Vollstaendigkeit (1 Zeile pro Symbol pro Minute, interval=1m, is_closed=1)",
+            bucket_s=60,
+            bucket_label="Minuten",
+            bucket_unit="Minute",
+            where_sql="interval = '1m' AND is_closed = 1",
+        ),
+        CompletenessCheck(
+            "agg_trades_5s",
+            "AggTrades Vollstaendigkeit (1 Zeile pro Symbol pro 5 Sekunden)",
+            bucket_s=5,
+            bucket_label="5s-Fenster",
+            bucket_unit="5s-Fenster",
+        ),
     )
+}
 
-    rows = client.query(
-        """
-        WITH
-          %(start)s AS start_sec,
-          %(end)s AS end_sec,
-          %(expected)s AS expected_symbols
-        SELECT
-          toDateTime(sec) AS second,
-          ifNull(actual_symbols, 0) AS actual,
-          expected_symbols - ifNull(actual_symbols, 0) AS missing
-        FROM
-          (SELECT arrayJoin(range(start_sec, end_sec + 1)) AS sec) AS timeline
-        LEFT JOIN
-          (
-            SELECT
-              toUInt32(ts_event_ns/{div}) AS sec,
-              countDistinct(instrument) AS actual_symbols
-            FROM {db}.{table}
-            WHERE sec BETWEEN start_sec AND end_sec
-            GROUP BY sec
-          ) AS actual USING sec
-        WHERE missing > 0
-        ORDER BY sec
-        """.format(db=current_db, table=table, div=divisor),
-        parameters={"start": start_sec, "end": end_sec, "expected": expected_symbols},
-    )
-    print("\nLuecken pro Sekunde (erste Zeilen):")
-    print_rows(rows.column_names, rows.result_rows)
 
-    per_symbol = client.query(
-        """
+def _completeness_sql(check: CompletenessCheck, source_mode: str) -> str:
+    """
+    Ein Query je Check und Quelle. db/table/div/minutes sind serverseitige Parameter,
+    der SQL-Text ist damit pro Check konstant (Query-Cache-fähig).
+    source_mode: "raw" (ts_event_ns/div), "sec" (materialisierte sec-Spalte) oder "rollup" (ROLLUP_TABLE).
+    """
+    if source_mode == "rollup":
+        # Rollup enthält bereits (sec, instrument) inkl. Check-Filter, sortiert nach (tbl, sec)
+        sec_expr = "sec"
+        source = "{db:Identifier}." + ROLLUP_TABLE
+        conditions = ["tbl = {table:String}"]
+    else:
+        # Auf sec greift der minmax-Skip-Index, auf den Ausdruck nicht
+        sec_expr = "sec" if source_mode == "sec" else "toUInt32(ts_event_ns/{div:UInt32})"
+        source = "{db:Identifier}.{table:Identifier}"
+        conditions = [check.where_sql] if check.where_sql else []
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    filter_sql = " ".join(f"AND {cond}" for cond in conditions)
+    # Bounds als skalarer Subquery (liest nur die Zeitspalte), Fenster wird serverseitig berechnet
+    # (minutes = 0 → gesamter Zeitraum). Danach ein Scan, zwei Gruppierungen:
+    #   (bucket)     → Symbole je Bucket (instrument = '')
+    #   (instrument) → Buckets je Symbol
+    # countDistinct folgt count_distinct_implementation (uniq bzw. mit --exact uniqExact)
+    return """
         WITH
-          %(start)s AS start_sec,
-          %(end)s AS end_sec,
-          (end_sec - start_sec + 1) AS expected_secs
+          (
+            SELECT (min({sec}), max({sec}))
+            FROM {source} {where}
+          ) AS bounds,
+          if(
+            {{minutes:UInt32}} = 0,
+            toInt64(bounds.1),
+            greatest(toInt64(bounds.1), toInt64(bounds.2) - {{minutes:UInt32}} * 60 + 1)
+          ) AS window_start,
+          toInt64(bounds.2) AS window_end
         SELECT
+          intDiv({sec}, {bucket_s}) AS bucket,
           instrument,
-          expected_secs - countDistinct(toUInt32(ts_event_ns/{div})) AS missing
-        FROM {db}.{table}
-        WHERE toUInt32(ts_event_ns/{div}) BETWEEN start_sec AND end_sec
-        GROUP BY instrument
-        HAVING missing > 0
-        ORDER BY missing DESC
-        LIMIT 20
-        """.format(db=current_db, table=table, div=divisor),
-        parameters={"start": start_sec, "end": end_sec},
+          countDistinct(instrument) AS symbols,
+          countDistinct(bucket) AS buckets,
+          any(window_start) AS start_sec,
+          any(window_end) AS end_sec
+        FROM {source}
+        WHERE {sec} BETWEEN window_start AND window_end
+          {filter}
+        GROUP BY GROUPING SETS ((bucket), (instrument))
+    """.format(
+        sec=sec_expr,
+        source=source,
+        where=where_clause,
+        bucket_s=check.bucket_s,
+        filter=filter_sql,
     )
-    print("\nTop 20 Symbole mit Luecken:")
-    print_rows(per_symbol.column_names, per_symbol.result_rows)
-
 
-def check_mark_price_completeness(client, settings: Settings, current_db: str) -> None:
-    _check_per_second_completeness(
-        client,
-        current_db,
-        table="mark_price",
-        title="Mark-Price Vollstaendigkeit (1 Zeile pro Symbol pro Sekunde)",
-    )
 
+COMPLETENESS_SOURCE_MODES = ("raw", "sec", "rollup")
 
-def check_funding_completeness(client, settings: Settings, current_db: str) -> None:
-    _check_per_second_completeness(
-        client,
-        current_db,
-        table="funding",
-        title="Funding Vollstaendigkeit (1 Zeile pro Symbol pro Sekunde)",
-    )
+# Einmal beim Import gebaut, pro Aufruf werden nur noch Parameter übergeben
+_COMPLETENESS_SQL: Dict[Tuple[str, str], str] = {
+    (name, mode): _completeness_sql(check, mode)
+    for name, check in COMPLETENESS_CHECKS.items()
+    for mode in COMPLETENESS_SOURCE_MODES
+}
 
 
-def check_ob_top5_completeness(client, settings: Settings, current_db: str) -> None:
-    print("\nOB Top5 Vollstaendigkeit (1 Zeile pro Symbol pro Sekunde)")
-    minutes_raw = input("Zeitraum in Minuten (Default 10, 'all' fuer alles): ").strip().lower()
-    if minutes_raw in {"", "10"}:
-        minutes = 10
-    elif minutes_raw == "all":
-        minutes = None
-    elif minutes_raw.isdigit():
-        minutes = int(minutes_raw)
-    else:
-        print("Ungueltige Eingabe.")
-        return
+def ensure_sec_columns(client, database: str) -> None:
+    """
+    Materialisierte sec-Spalte (UInt32 Sekunden) + minmax-Skip-Index auf den Check-Tabellen anlegen.
+    Die Tabellen sind nach (instrument, ts_event_ns) sortiert; ein Zeitfilter allein kann ohne
+    Skip-Index keine Granules überspringen.
+    """
+    db = _quote_ident(database)
+    existing = frozenset(fetch_tables(client, database))
+    for check in COMPLETENESS_CHECKS.values():
+        if check.table not in existing:
+            continue
+        # MATERIALIZED-Ausdruck friert den Divisor ein → leere Tabellen (Einheit unbekannt) auslassen
+        detected = _probe_time_divisor(client, database, check.table)
+        if detected is None:
+            print(f"sec-Spalte fuer {check.table} uebersprungen: noch keine Daten, Zeiteinheit unbekannt.")
+            continue
+        divisor, _ = detected
+        table = f"{db}.{_quote_ident(check.table)}"
+        client.command(
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS sec UInt32 MATERIALIZED toUInt32(ts_event_ns / {divisor})"
+        )
+        client.command(f"ALTER TABLE {table} ADD INDEX IF NOT EXISTS idx_sec sec TYPE minmax GRANULARITY 4")
+        # Bestandsparts nachziehen (Mutation läuft asynchron im Hintergrund)
+        client.command(f"ALTER TABLE {table} MATERIALIZE INDEX idx_sec")
+        print(f"sec-Spalte fuer {check.table} sichergestellt.")
+    invalidate_meta_cache(database)
 
-    divisor, unit = _detect_time_divisor(client, current_db, "ob_top5")
-    bounds = client.query(
-        "SELECT min(toUInt32(ts_event_ns/{div})) AS min_sec, "
-        "max(toUInt32(ts_event_ns/{div})) AS max_sec "
-        "FROM {db}.ob_top5".format(db=current_db, div=divisor)
-    )
-    min_sec, max_sec = bounds.result_rows[0]
-    if min_sec is None or max_sec is None:
-        print("Keine Daten in ob_top5.")
-        return
 
-    if minutes is None:
-        start_sec = int(min_sec)
-    else:
-        start_sec = max(int(min_sec), int(max_sec) - minutes * 60 + 1)
-    end_sec = int(max_sec)
+def _rollup_view_name(table: str) -> str:
+    return f"{ROLLUP_TABLE}_mv_{table}"
 
-    expected = client.query(
-        "SELECT countDistinct(instrument) FROM {db}.ob_top5 "
-        "WHERE toUInt32(ts_event_ns/{div}) BETWEEN %(start)s AND %(end)s".format(db=current_db, div=divisor),
-        parameters={"start": start_sec, "end": end_sec},
-    )
-    expected_symbols = expected.result_rows[0][0]
-    if not expected_symbols:
-        print("Keine Symbole im gewaehlten Zeitraum.")
-        return
 
-    summary = client.query(
-        """
-        WITH
-          %(start)s AS start_sec,
-          %(end)s AS end_sec,
-          %(expected)s AS expected_symbols
-        SELECT
-          sum(missing) AS missing_total,
-          countIf(missing > 0) AS seconds_with_missing,
-          max(missing) AS max_missing
-        FROM (
-          SELECT
-            sec,
-            expected_symbols - ifNull(actual_symbols, 0) AS missing
-          FROM
-            (SELECT arrayJoin(range(start_sec, end_sec + 1)) AS sec) AS timeline
-          LEFT JOIN
-            (
-              SELECT
-                toUInt32(ts_event_ns/{div}) AS sec,
-                countDistinct(instrument) AS actual_symbols
-              FROM {db}.ob_top5
-              WHERE sec BETWEEN start_sec AND end_sec
-              GROUP BY sec
-            ) AS actual USING sec
+def ensure_completeness_rollup(client, database: str) -> None:
+    """
+    Rollup (tbl, sec, instrument) für die Vollständigkeits-Checks anlegen: eine Materialized View
+    je Quelltabelle schreibt neue Inserts mit, Bestandsdaten werden einmalig nachgeladen.
+    Doppelte Zeilen (Insert zwischen View-Anlage und Backfill) sind für countDistinct unschädlich.
+    """
+    db = _quote_ident(database)
+    client.command(
+        f"""
+        CREATE TABLE IF NOT EXISTS {db}.{ROLLUP_TABLE} (
+            tbl LowCardinality(String),
+            sec UInt32,
+            instrument LowCardinality(String)
         )
-        """.format(db=current_db, div=divisor),
-        parameters={"start": start_sec, "end": end_sec, "expected": expected_symbols},
-    )
-    missing_total, seconds_with_missing, max_missing = summary.result_rows[0]
-
-    print(
-        f"Zeitraum: {start_sec}..{end_sec} (Sekunden, ts_event in {unit}), Symbole: {expected_symbols}\n"
-        f"Fehlende Eintraege gesamt: {missing_total}, "
-        f"Sekunden mit Luecken: {seconds_with_missing}, "
-        f"Max fehlend in Sekunde: {max_missing}"
-    )
-
-    rows = client.query(
+        ENGINE = ReplacingMergeTree
+        ORDER BY (tbl, sec, instrument)
         """
-        WITH
-          %(start)s AS start_sec,
-          %(end)s AS end_sec,
-          %(expected)s AS expected_symbols
-        SELECT
-          toDateTime(sec) AS second,
-          ifNull(actual_symbols, 0) AS actual,
-          expected_symbols - ifNull(actual_symbols, 0) AS missing
-        FROM
-          (SELECT arrayJoin(range(start_sec, end_sec + 1)) AS sec) AS timeline
-        LEFT JOIN
-          (
-            SELECT
-              toUInt32(ts_event_ns/{div}) AS sec,
-              countDistinct(instrument) AS actual_symbols
-            FROM {db}.ob_top5
-            WHERE sec BETWEEN start_sec AND end_sec
-            GROUP BY sec
-          ) AS actual USING sec
-        WHERE missing > 0
-        ORDER BY sec
-        """.format(db=current_db, div=divisor),
-        parameters={"start": start_sec, "end": end_sec, "expected": expected_symbols},
     )
-    print("\nLuecken pro Sekunde (erste Zeilen):")
-    print_rows(rows.column_names, rows.result_rows)
-
-    per_symbol = client.query(
-        """
-        WITH
-          %(start)s AS start_sec,
-          %(end)s AS end_sec,
-          (end_sec - start_sec + 1) AS expected_secs
-        SELECT
-          instrument,
-          expected_secs - countDistinct(toUInt32(ts_event_ns/{div})) AS missing
-        FROM {db}.ob_top5
-        WHERE toUInt32(ts_event_ns/{div}) BETWEEN start_sec AND end_sec
-        GROUP BY instrument
-        HAVING missing > 0
-        ORDER BY missing DESC
-        LIMIT 20
-        """.format(db=current_db, div=divisor),
-        parameters={"start": start_sec, "end": end_sec},
-    )
-    print("\nTop 20 Symbole mit Luecken:")
-    print_rows(per_symbol.column_names, per_symbol.result_rows)
+    existing = frozenset(fetch_tables(client, database))
+    for check in COMPLETENESS_CHECKS.values():
+        view = _rollup_view_name(check.table)
+        if check.table not in existing or view in existing:
+            continue
+        # Der Divisor wird fest in die View geschrieben → nur mit bekannter Zeiteinheit anlegen
+        detected = _probe_time_divisor(client, database, check.table)
+        if detected is None:
+            print(f"Rollup fuer {check.table} uebersprungen: noch keine Daten, Zeiteinheit unbekannt.")
+            continue
+        divisor, _ = detected
+        where_clause = f"WHERE {check.where_sql}" if check.where_sql else ""
+        select_sql = (
+            f"SELECT {_quote_str(check.table)} AS tbl, toUInt32(ts_event_ns/{divisor}) AS sec, instrument "
+            f"FROM {db}.{_quote_ident(check.table)} {where_clause} GROUP BY sec, instrument"
+        )
+        client.command(f"CREATE MATERIALIZED VIEW IF NOT EXISTS {db}.{view} TO {db}.{ROLLUP_TABLE} AS {select_sql}")
+        client.command(f"INSERT INTO {db}.{ROLLUP_TABLE} {select_sql}")
+        print(f"Rollup fuer {check.table} angelegt.")
+    invalidate_meta_cache(database)
 
 
-def check_klines_1m_completeness(client, settings: Settings, current_db: str) -> None:
-    print("\nKlines Vollstaendigkeit (1 Zeile pro Symbol pro Minute, interval=1m, is_closed=1)")
-    minutes_raw = input("Zeitraum in Minuten (Default 10, 'all' fuer alles): ").strip().lower()
-    if minutes_raw in {"", "10"}:
-        minutes = 10
-    elif minutes_raw == "all":
-        minutes = None
-    elif minutes_raw.isdigit():
-        minutes = int(minutes_raw)
-    else:
+def _check_completeness(client, settings: Settings, current_db: str, check: CompletenessCheck) -> None:
+    """
+    Vollständigkeit: jedes Symbol soll in jedem Bucket (1s/5s/1m) mindestens eine Zeile haben.
+    EIN Query liefert Zeitfenster sowie über GROUPING SETS die Symbole pro Bucket und die
+    Buckets pro Symbol; Summary/Lücken werden lokal abgeleitet.
+    """
+    print(f"\n{check.title}")
+    minutes = _prompt_window_minutes()
+    if minutes is None:
         print("Ungueltige Eingabe.")
         return
 
-    divisor, unit = _detect_time_divisor(client, current_db, "klines")
-    bounds = client.query(
-        "SELECT min(toUInt32(ts_event_ns/{div})) AS min_sec, "
-        "max(toUInt32(ts_event_ns/{div})) AS max_sec "
-        "FROM {db}.klines WHERE interval = '1m' AND is_closed = 1".format(
-            db=current_db, div=divisor
-        )
+    bucket_s = check.bucket_s
+    divisor, unit = _detect_time_divisor(client, current_db, check.table)
+    if _rollup_view_name(check.table) in fetch_tables(client, current_db):
+        source_mode = "rollup"
+        print(f"(Quelle: {ROLLUP_TABLE})")
+    elif _has_sec_column(client, current_db, check.table):
+        source_mode = "sec"
+    else:
+        source_mode = "raw"
+    result = client.query(
+        _COMPLETENESS_SQL[(check.table, source_mode)],
+        parameters={"db": current_db, "table": check.table, "div": divisor, "minutes": minutes},
+        settings={
+            **_read_settings(client),
+            "count_distinct_implementation": "uniqExact" if settings.exact_counts else "uniq",
+        },
+        column_oriented=True,
     )
-    min_sec, max_sec = bounds.result_rows[0]
-    if min_sec is None or max_sec is None:
-        print("Keine Daten in klines (interval=1m, is_closed=1).")
+    # Spaltenweise lesen: die Native-Blöcke kommen spaltenweise an, result_rows würde
+    # daraus erst eine Zeilenmatrix (ein Tupel pro Zeile) aufbauen
+    if not result.row_count:
+        suffix = f" ({check.where_sql})." if check.where_sql else "."
+        print(f"Keine Daten in {check.table}{suffix}")
         return
+    buckets, instruments, symbol_counts, bucket_counts, starts, ends = result.result_columns
+    start_sec, end_sec = int(starts[0]), int(ends[0])
+    per_bucket: Dict[int, int] = {}
+    per_symbol: Dict[str, int] = {}
+    for bucket, instrument, symbols_in_bucket, buckets_of_symbol in zip(
+        buckets, instruments, symbol_counts, bucket_counts
+    ):
+        if instrument:
+            per_symbol[instrument] = buckets_of_symbol
+        else:
+            per_bucket[bucket] = symbols_in_bucket
 
-    if minutes is None:
-        start_sec = int(min_sec)
-    else:
-        start_sec = max(int(min_sec), int(max_sec) - minutes * 60 + 1)
-    end_sec = int(max_sec)
-
-    expected = client.query(
-        "SELECT countDistinct(instrument) FROM {db}.klines "
-        "WHERE interval = '1m' AND is_closed = 1 "
-        "AND toUInt32(ts_event_ns/{div}) BETWEEN %(start)s AND %(end)s".format(
-            db=current_db, div=divisor
-        ),
-        parameters={"start": start_sec, "end": end_sec},
-    )
-    expected_symbols = expected.result_rows[0][0]
+    expected_symbols = len(per_symbol)
     if not expected_symbols:
         print("Keine Symbole im gewaehlten Zeitraum.")
         return
 
-    summary = client.query(
-        """
-        WITH
-          %(start)s AS start_sec,
-          %(end)s AS end_sec,
-          %(expected)s AS expected_symbols
-        SELECT
-          sum(missing) AS missing_total,
-          countIf(missing > 0) AS minutes_with_missing,
-          max(missing) AS max_missing
-        FROM (
-          SELECT
-            minute,
-            expected_symbols - ifNull(actual_symbols, 0) AS missing
-          FROM
-            (SELECT arrayJoin(range(intDiv(start_sec, 60), intDiv(end_sec, 60) + 1)) AS minute) AS timeline
-          LEFT JOIN
-            (
-              SELECT
-                toUInt32(intDiv(ts_event_ns/{div}, 60)) AS minute,
-                countDistinct(instrument) AS actual_symbols
-              FROM {db}.klines
-              WHERE interval = '1m' AND is_closed = 1
-                AND toUInt32(ts_event_ns/{div}) BETWEEN start_sec AND end_sec
-              GROUP BY minute
-            ) AS actual USING minute
-        )
-        """.format(db=current_db, div=divisor),
-        parameters={"start": start_sec, "end": end_sec, "expected": expected_symbols},
+    first_bucket = start_sec // bucket_s
+    last_bucket = end_sec // bucket_s
+    n_buckets = last_bucket - first_bucket + 1
+    # Nur die beobachteten Buckets durchlaufen; komplett leere Buckets ergeben sich als Differenz,
+    # statt die Zeitachse (bei "all" ggf. Millionen Sekunden) lückenlos abzulaufen
+    empty_buckets = n_buckets - len(per_bucket)
+    missing_total = empty_buckets * expected_symbols
+    buckets_with_missing = empty_buckets
+    max_missing = expected_symbols if empty_buckets else 0
+    for actual in per_bucket.values():
+        missing = expected_symbols - actual
+        if missing > 0:
+            missing_total += missing
+            buckets_with_missing += 1
+            if missing > max_missing:
+                max_missing = missing
+    gap_rows = (
+        _first_gap_rows(per_bucket, first_bucket, last_bucket, expected_symbols, bucket_s)
+        if buckets_with_missing
+        else []
     )
-    missing_total, minutes_with_missing, max_missing = summary.result_rows[0]
 
     print(
         f"Zeitraum: {start_sec}..{end_sec} (Sekunden, ts_event in {unit}), Symbole: {expected_symbols}\n"
         f"Fehlende Eintraege gesamt: {missing_total}, "
-        f"Minuten mit Luecken: {minutes_with_missing}, "
-        f"Max fehlend pro Minute: {max_missing}"
+        f"{check.bucket_label} mit Luecken: {buckets_with_missing}, "
+        f"Max fehlend pro {check.bucket_unit}: {max_missing}"
     )
 
-    rows = client.query(
-        """
-        WITH
-          %(start)s AS start_sec,
-          %(end)s AS end_sec,
-          %(expected)s AS expected_symbols
-        SELECT
-          minute,
-          expected_symbols - ifNull(actual_symbols, 0) AS missing
-        FROM
-          (SELECT arrayJoin(range(intDiv(start_sec, 60), intDiv(end_sec, 60) + 1)) AS minute) AS timeline
-        LEFT JOIN
-          (
-            SELECT
-              toUInt32(intDiv(ts_event_ns/{div}, 60)) AS minute,
-              countDistinct(instrument) AS actual_symbols
-            FROM {db}.klines
-            WHERE interval = '1m' AND is_closed = 1
-              AND toUInt32(ts_event_ns/{div}) BETWEEN start_sec AND end_sec
-            GROUP BY minute
-          ) AS actual USING minute
-        WHERE expected_symbols - ifNull(actual_symbols, 0) > 0
-        ORDER BY minute DESC
-        LIMIT 20
-        """.format(db=current_db, div=divisor),
-        parameters={"start": start_sec, "end": end_sec, "expected": expected_symbols},
-    )
-    if rows.result_rows:
-        print("\nBeispiele mit Luecken (minute, missing):")
-        print_rows(rows.column_names, rows.result_rows)
-    else:
+    if not gap_rows:
         print("\nKeine Luecken im betrachteten Zeitraum gefunden.")
-
-
-def check_agg_trades_5s_completeness(client, settings: Settings, current_db: str) -> None:
-    print("\nAggTrades Vollstaendigkeit (1 Zeile pro Symbol pro 5 Sekunden)")
-    minutes_raw = input("Zeitraum in Minuten (Default 10, 'all' fuer alles): ").strip().lower()
-    if minutes_raw in {"", "10"}:
-        minutes = 10
-    elif minutes_raw == "all":
-        minutes = None
-    elif minutes_raw.isdigit():
-        minutes = int(minutes_raw)
-    else:
-        print("Ungueltige Eingabe.")
         return
 
-    divisor, unit = _detect_time_divisor(client, current_db, "agg_trades_5s")
-    bounds = client.query(
-        "SELECT min(toUInt32(ts_event_ns/{div})) AS min_sec, "
-        "max(toUInt32(ts_event_ns/{div})) AS max_sec "
-        "FROM {db}.agg_trades_5s".format(db=current_db, div=divisor)
+    print(f"\nLuecken pro {check.bucket_unit} (erste Zeilen):")
+    print_rows(["start_utc", "actual", "missing"], gap_rows)
+    if buckets_with_missing > len(gap_rows):
+        print(f"... ({buckets_with_missing - len(gap_rows)} weitere Zeilen unterdrückt)")
+
+    symbol_gaps = heapq.nlargest(
+        20,
+        ((instrument, n_buckets - present) for instrument, present in per_symbol.items() if present < n_buckets),
+        key=lambda item: item[1],
     )
-    min_sec, max_sec = bounds.result_rows[0]
-    if min_sec is None or max_sec is None:
-        print("Keine Daten in agg_trades_5s.")
-        return
+    print("\nTop 20 Symbole mit Luecken:")
+    print_rows(["instrument", "missing"], symbol_gaps)
+
+
+def _first_gap_rows(
+    per_bucket: Dict[int, int],
+    first_bucket: int,
+    last_bucket: int,
+    expected_symbols: int,
+    bucket_s: int,
+) -> List[Tuple[str, int, int]]:
+    """Die ersten MAX_DISPLAY_ROWS Buckets mit Lücken in zeitlicher Reihenfolge (inkl. leerer Buckets)."""
+    rows: List[Tuple[str, int, int]] = []
+    next_bucket = first_bucket
+    for bucket in sorted(per_bucket):
+        # Leere Buckets zwischen zwei beobachteten
+        while next_bucket < bucket and len(rows) < MAX_DISPLAY_ROWS:
+            rows.append((_format_bucket(next_bucket * bucket_s), 0, expected_symbols))
+            next_bucket += 1
+        if len(rows) >= MAX_DISPLAY_ROWS:
+            return rows
+        actual = per_bucket[bucket]
+        if actual < expected_symbols:
+            rows.append((_format_bucket(bucket * bucket_s), actual, expected_symbols - actual))
+        next_bucket = bucket + 1
+    while next_bucket <= last_bucket and len(rows) < MAX_DISPLAY_ROWS:
+        rows.append((_format_bucket(next_bucket * bucket_s), 0, expected_symbols))
+        next_bucket += 1
+    return rows
+
+
+def _format_bucket(sec: int) -> str:
+    return datetime.fromtimestamp(sec, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
 
-    if minutes is None:
-        start_sec = int(min_sec)
-    else:
-        start_sec = max(int(min_sec), int(max_sec) - minutes * 60 + 1)
-    end_sec = int(max_sec)
 
-    expected = client.query(
-        "SELECT countDistinct(instrument) FROM {db}.agg_trades_5s "
-        "WHERE toUInt32(ts_event_ns/{div}) BETWEEN %(start)s AND %(end)s".format(
-            db=current_db, div=divisor
-        ),
-        parameters={"start": start_sec, "end": end_sec},
-    )
-    expected_symbols = expected.result_rows[0][0]
-    if not expected_symbols:
-        print("Keine Symbole im gewaehlten Zeitraum.")
-        return
+def check_mark_price_completeness(client, settings: Settings, current_db: str) -> None:
+    _check_completeness(client, settings, current_db, COMPLETENESS_CHECKS["mark_price"])
 
-    summary = client.query(
-        """
-        WITH
-          %(start)s AS start_sec,
-          %(end)s AS end_sec,
-          %(expected)s AS expected_symbols
-        SELECT
-          sum(missing) AS missing_total,
-          countIf(missing > 0) AS windows_with_missing,
-          max(missing) AS max_missing
-        FROM (
-          SELECT
-            toUInt32(intDiv(sec, 5)) AS window,
-            expected_symbols - ifNull(actual_symbols, 0) AS missing
-          FROM
-            (SELECT arrayJoin(range(start_sec, end_sec + 1)) AS sec) AS timeline
-          LEFT JOIN
-            (
-              SELECT
-                toUInt32(ts_event_ns/{div}) AS sec,
-                countDistinct(instrument) AS actual_symbols
-              FROM {db}.agg_trades_5s
-              WHERE sec BETWEEN start_sec AND end_sec
-              GROUP BY sec
-            ) AS actual USING sec
-          GROUP BY window
-        )
-        """.format(db=current_db, div=divisor),
-        parameters={"start": start_sec, "end": end_sec, "expected": expected_symbols},
-    )
-    missing_total, windows_with_missing, max_missing = summary.result_rows[0]
 
-    print(
-        f"Zeitraum: {start_sec}..{end_sec} (Sekunden, ts_event in {unit}), Symbole: {expected_symbols}\n"
-        f"Fehlende Eintraege gesamt: {missing_total}, "
-        f"5s-Fenster mit Luecken: {windows_with_missing}, "
-        f"Max fehlend pro 5s: {max_missing}"
-    )
+def check_funding_completeness(client, settings: Settings, current_db: str) -> None:
+    _check_completeness(client, settings, current_db, COMPLETENESS_CHECKS["funding"])
 
-    rows = client.query(
-        """
-        WITH
-          %(start)s AS start_sec,
-          %(end)s AS end_sec,
-          %(expected)s AS expected_symbols
-        SELECT
-          toUInt32(intDiv(sec, 5)) AS window,
-          expected_symbols - countDistinct(instrument) AS missing
-        FROM {db}.agg_trades_5s
-        WHERE toUInt32(ts_event_ns/{div}) BETWEEN start_sec AND end_sec
-        GROUP BY window
-        HAVING missing > 0
-        ORDER BY window DESC
-        LIMIT 20
-        """.format(db=current_db, div=divisor),
-        parameters={"start": start_sec, "end": end_sec, "expected": expected_symbols},
-    )
-    if rows.result_rows:
-        print("\nBeispiele mit Luecken (window, missing):")
-        print_rows(rows.column_names, rows.result_rows)
-    else:
-        print("\nKeine Luecken im betrachteten Zeitraum gefunden.")
+
+def check_ob_top5_completeness(client, settings: Settings, current_db: str) -> None:
+    _check_completeness(client, settings, current_db, COMPLETENESS_CHECKS["ob_top5"])
+
+
+def check_klines_1m_completeness(client, settings: Settings, current_db: str) -> None:
+    _check_completeness(client, settings, current_db, COMPLETENESS_CHECKS["klines"])
+
+
+def check_agg_trades_5s_completeness(client, settings: Settings, current_db: str) -> None:
+    _check_completeness(client, settings, current_db, COMPLETENESS_CHECKS["agg_trades_5s"])
 
 
 def show_latest_rows(client, settings: Settings, current_db: str) -> None:
@@ -765,12 +779,12 @@ def show_latest_rows(client, settings: Settings, current_db: str) -> None:
     except ValueError:
         print("Ungueltige Eingabe.")
         return
-    query = f"SELECT * FROM {current_db}.{table} ORDER BY ts_event_ns DESC LIMIT {limit}"
-    result = client.query(query)
-    if result.result_rows:
-        print_rows(result.column_names, result.result_rows)
-    else:
-        print("Keine Daten gefunden.")
+    print_query(
+        client,
+        "SELECT * FROM {db:Identifier}.{table:Identifier} ORDER BY ts_event_ns DESC LIMIT {limit:UInt64}",
+        {"db": current_db, "table": table, "limit": limit},
+        empty_message="Keine Daten gefunden.",
+    )
 
 
 def drop_database(client, settings: Settings, current_db: str) -> str:
@@ -778,17 +792,18 @@ def drop_database(client, settings: Settings, current_db: str) -> str:
     if confirm != "yes":
         print("Abgebrochen.")
         return current_db
-    client.command(f"DROP DATABASE {current_db}")
+    client.command(f"DROP DATABASE {_quote_ident(current_db)}")
+    invalidate_meta_cache()
     print("Datenbank gelöscht.")
     return settings.database
 
 
 def check_latency(client, *_args) -> None:
-    import time
-
-    start = time.perf_counter()
-    client.query("SELECT 1")
-    duration_ms = (time.perf_counter() - start) * 1000
+    # FORMAT Null: keine Ergebniszeilen → kein Parsing auf Clientseite in der Messung
+    client.command("SELECT 1 FORMAT Null")  # Warm-up, Verbindung im Pool aufbauen
+    start = time.perf_counter_ns()
+    client.command("SELECT 1 FORMAT Null")
+    duration_ms = (time.perf_counter_ns() - start) / 1_000_000
     print(f"Roundtrip: {duration_ms:.2f} ms")
 
 
@@ -801,39 +816,69 @@ def prompt_table_name(client, database: str) -> str:
     for idx, name in enumerate(tables, 1):
         marker = " (Standard)" if name in DEFAULT_TABLES else ""
         print(f"  {idx}. {name}{marker}")
+    tables_set = frozenset(tables)
     choice = input("Tabellenname oder Nummer: ").strip()
+    if choice in tables_set:
+        return choice
     if choice.isdigit():
         idx = int(choice) - 1
         if 0 <= idx < len(tables):
             return tables[idx]
-    if choice in tables:
-        return choice
     print("Ungültige Auswahl.")
     return ""
 
 
-def print_rows(columns: Sequence[str], rows: Sequence[Sequence[object]]) -> None:
+def print_query(client, query: str, parameters=None, *, empty_message: str = "Keine Daten.") -> None:
+    """
+    Ergebnis streamen statt komplett zu materialisieren: es werden nur so viele Zeilen gelesen,
+    wie angezeigt werden (+1 zur Erkennung weiterer Zeilen), danach wird der Stream geschlossen.
+    """
+    with client.query_rows_stream(query, parameters=parameters) as stream:
+        rows = list(itertools.islice(stream, MAX_DISPLAY_ROWS + 1))
+        columns = stream.source.column_names
     if not rows:
+        print(empty_message)
+        return
+    # als Iterator übergeben: Gesamtzahl ist unbekannt, nur "weitere Zeilen" melden
+    print_rows(columns, iter(rows))
+
+
+def print_rows(columns: Sequence[str], rows: Iterable[Sequence[object]]) -> None:
+    if isinstance(rows, Sequence):
+        total: Optional[int] = len(rows)
+        display = list(rows[:MAX_DISPLAY_ROWS])
+    else:
+        # Iterator: nur MAX_DISPLAY_ROWS puffern, Gesamtzahl bleibt unbekannt
+        total = None
+        display = list(itertools.islice(rows, MAX_DISPLAY_ROWS + 1))
+    if not display:
         print("Keine Daten.")
         return
-    display = list(rows[:MAX_DISPLAY_ROWS])
+    more = len(display) > MAX_DISPLAY_ROWS if total is None else total > MAX_DISPLAY_ROWS
+    display = display[:MAX_DISPLAY_ROWS]
     widths = [len(col) for col in columns]
     formatted: List[List[str]] = []
     for row in display:
-        formatted_row = [format_cell(value) for value in row]
+        formatted_row = ["" if value is None else format_cell(value) for value in row]
         formatted.append(formatted_row)
         for idx, cell in enumerate(formatted_row):
-            widths[idx] = max(widths[idx], len(cell))
-    separator = "+".join("-" * (w + 2) for w in widths)
-    header = "|".join(f" {columns[idx].ljust(widths[idx])} " for idx in range(len(columns)))
-    print(separator)
-    print(header)
-    print(separator)
+            if len(cell) > widths[idx]:
+                widths[idx] = len(cell)
+    # Zeilenformat einmal bauen, Ausgabe gesammelt mit einem write statt print pro Zeile
+    row_fmt = "|".join(f" {{:<{w}}} " for w in widths) + "\n"
+    separator = "+".join("-" * (w + 2) for w in widths) + "\n"
+    buf = io.StringIO()
+    buf.write(separator)
+    buf.write(row_fmt.format(*columns))
+    buf.write(separator)
     for row in formatted:
-        print("|".join(f" {row[idx].ljust(widths[idx])} " for idx in range(len(row))))
-    print(separator)
-    if len(rows) > MAX_DISPLAY_ROWS:
-        print(f"... ({len(rows) - MAX_DISPLAY_ROWS} weitere Zeilen unterdrückt)")
+        buf.write(row_fmt.format(*row))
+    buf.write(separator)
+    if more and total is not None:
+        buf.write(f"... ({total - MAX_DISPLAY_ROWS} weitere Zeilen unterdrückt)\n")
+    elif more:
+        buf.write("... (weitere Zeilen unterdrückt)\n")
+    sys.stdout.write(buf.getvalue())
 
 
 def format_cell(value: object) -> str:
@@ -843,46 +888,54 @@ def format_cell(value: object) -> str:
     return text if len(text) <= 120 else text[:117] + "..."
 
 
+# Menü einmal beim Import festlegen: Anzeige und Dispatch kommen aus derselben Struktur
+_ACTIONS: Tuple[Tuple[str, str, Callable], ...] = (
+    ("1", "Tabellen auflisten", list_tables),
+    ("2", "Tabellenschema anzeigen", describe_table),
+    ("3", "Tabelleninhalt ansehen", view_data),
+    ("4", "Zeilenanzahl pro Tabelle", count_rows),
+    ("5", "Eigene SQL-Abfrage ausführen", run_custom_sql),
+    ("6", "Datenbanken auflisten", list_databases),
+    ("7", "Datenbank wechseln", switch_database),
+    ("8", "Tabelle löschen", drop_table),
+    ("9", "Datenbank löschen", drop_database),
+    ("0", "Latenz prüfen", check_latency),
+    ("10", "Mark-Price Vollstaendigkeit (1s)", check_mark_price_completeness),
+    ("11", "OB Top5 Vollstaendigkeit (1s)", check_ob_top5_completeness),
+    ("12", "Klines Vollstaendigkeit (1m, is_closed)", check_klines_1m_completeness),
+    ("13", "AggTrades Vollstaendigkeit (5s)", check_agg_trades_5s_completeness),
+    ("14", "Letzte Zeilen anzeigen", show_latest_rows),
+    ("15", "Funding Vollstaendigkeit (1s)", check_funding_completeness),
+    ("r", "Metadaten neu laden", refresh_metadata),
+    ("q", "Beenden", lambda *args: None),
+)
+_ACTION_HANDLERS: Dict[str, Callable] = {key: handler for key, _, handler in _ACTIONS}
+_MENU_TEXT = "\n".join(f"  {key} -> {label}" for key, label, _ in _ACTIONS)
+_QUIT_CHOICES = frozenset({"q", "quit", "exit"})
+
+
 def main() -> None:
     args = parse_args()
     settings = resolve_settings(args)
     client = get_client(settings)
     current_db = settings.database
     print(f"Verbunden mit ClickHouse @ {settings.host}:{settings.port}, DB='{current_db}'\n")
-
-    actions: Dict[str, Tuple[str, Callable]] = {
-        "1": ("Tabellen auflisten", list_tables),
-        "2": ("Tabellenschema anzeigen", describe_table),
-        "3": ("Tabelleninhalt ansehen", view_data),
-        "4": ("Zeilenanzahl pro Tabelle", count_rows),
-        "5": ("Eigene SQL-Abfrage ausführen", run_custom_sql),
-        "6": ("Datenbanken auflisten", list_databases),
-        "7": ("Datenbank wechseln", switch_database),
-        "8": ("Tabelle löschen", drop_table),
-        "9": ("Datenbank löschen", drop_database),
-        "0": ("Latenz prüfen", check_latency),
-        "10": ("Mark-Price Vollstaendigkeit (1s)", check_mark_price_completeness),
-        "11": ("OB Top5 Vollstaendigkeit (1s)", check_ob_top5_completeness),
-        "12": ("Klines Vollstaendigkeit (1m, is_closed)", check_klines_1m_completeness),
-        "13": ("AggTrades Vollstaendigkeit (5s)", check_agg_trades_5s_completeness),
-        "14": ("Letzte Zeilen anzeigen", show_latest_rows),
-        "15": ("Funding Vollstaendigkeit (1s)", check_funding_completeness),
-        "q": ("Beenden", lambda *args: None),
-    }
+    if args.ensure_sec_column:
+        ensure_sec_columns(client, current_db)
+    if args.ensure_rollup:
+        ensure_completeness_rollup(client, current_db)
 
     while True:
         print(f"\nAktionen (aktuelle DB: {current_db}):")
-        for key, (label, _) in actions.items():
-            print(f"  {key} -> {label}")
+        print(_MENU_TEXT)
         choice = input("Auswahl: ").strip().lower()
-        if choice in {"q", "quit", "exit"}:
+        if choice in _QUIT_CHOICES:
             print("Beende Inspector.")
             break
-        action = actions.get(choice)
-        if not action:
+        handler = _ACTION_HANDLERS.get(choice)
+        if handler is None:
             print("Ungültige Auswahl.")
             continue
-        label, handler = action
         if handler is switch_database:
             current_db = handler(client, settings, current_db)  # type: ignore[arg-type]
             client = get_client(settings, current_db)
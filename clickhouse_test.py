@@ -2,8 +2,10 @@ from __future__ import annotations
 
 import os
 from datetime import datetime
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
-from typing import Iterable, Mapping, Sequence
+from typing import Iterable, Iterator, Mapping, Sequence
 
 import clickhouse_connect
 import pandas as pd
@@ -16,10 +18,31 @@ CLICKHOUSE_USER = os.getenv("CLICKHOUSE_USER", "felix")
 CLICKHOUSE_PASSWORD = os.getenv("CLICKHOUSE_PASSWORD", "testpass")
 CLICKHOUSE_DB = os.getenv("CLICKHOUSE_DB", "mydb")
 CLICKHOUSE_TABLE = os.getenv("CLICKHOUSE_TABLE", "trades")
+INSERT_BATCH_ROWS = int(os.getenv("CLICKHOUSE_INSERT_BATCH_ROWS", "5000"))
 EXPORT_PATH = Path(
     os.getenv("CLICKHOUSE_EXPORT_PATH", r"C:\clickhouse_exports\trades.parquet")
 )
 
+# Static SQL, built once at import; only LIMIT varies and is bound server-side.
+_QUALIFIED_TABLE = f"{CLICKHOUSE_DB}.{CLICKHOUSE_TABLE}"
+_CREATE_DATABASE_SQL = f"CREATE DATABASE IF NOT EXISTS {CLICKHOUSE_DB}"
+_CREATE_TABLE_SQL = f"""
+    CREATE TABLE IF NOT EXISTS {_QUALIFIED_TABLE} (
+        symbol String,
+        price Float64,
+        volume Float64,
+        ts DateTime
+    )
+    ENGINE = MergeTree()
+    ORDER BY ts
+"""
+_FETCH_LATEST_SQL = f"""
+    SELECT *
+    FROM {_QUALIFIED_TABLE}
+    ORDER BY ts DESC
+    LIMIT {{limit:UInt64}}
+"""
+
 
 def get_client() -> Client:
     """Return a configured ClickHouse HTTP client."""
@@ -33,22 +56,11 @@ def get_client() -> Client:
 
 
 def ensure_database(client: Client) -> None:
-    client.command(f"CREATE DATABASE IF NOT EXISTS {CLICKHOUSE_DB}")
+    client.command(_CREATE_DATABASE_SQL)
 
 
 def ensure_table(client: Client) -> None:
-    client.command(
-        f"""
-        CREATE TABLE IF NOT EXISTS {CLICKHOUSE_DB}.{CLICKHOUSE_TABLE} (
-            symbol String,
-            price Float64,
-            volume Float64,
-            ts DateTime
-        )
-        ENGINE = MergeTree()
-        ORDER BY ts
-        """
-    )
+    client.command(_CREATE_TABLE_SQL)
 
 
 def insert_rows(
@@ -63,45 +75,93 @@ def insert_rows(
 
     Accepts either a pandas DataFrame, an iterable of mappings (dict-like), or an
     iterable of iterables in the column order defined by column_names.
+    Generic entry point; callers that know their row shape should call
+    insert_rows_df / insert_rows_mapping / insert_rows_sequence directly and skip
+    the type dispatch.
     """
     if isinstance(rows, pd.DataFrame):
-        column_names = list(rows.columns)
-        payload = [tuple(row) for row in rows.itertuples(index=False, name=None)]
+        insert_rows_df(client, rows)
+        return
+
+    iterator = iter(rows)
+    chunk = list(islice(iterator, INSERT_BATCH_ROWS))
+    if not chunk:
+        return
+    if isinstance(chunk[0], Mapping):
+        _insert_mapping_chunks(client, chunk, iterator, column_names)
     else:
-        rows_list = list(rows)
-        if not rows_list:
-            return
-
-        first_row = rows_list[0]
-        if isinstance(first_row, Mapping):
-            if column_names is None:
-                column_names = list(first_row.keys())
-            payload = [
-                tuple(row[col] for col in column_names) for row in rows_list  # type: ignore[arg-type]
-            ]
+        _insert_sequence_chunks(client, chunk, iterator, column_names)
+
+
+def insert_rows_df(client: Client, df: pd.DataFrame) -> None:
+    """Insert a DataFrame column-oriented; the driver serializes the columns directly."""
+    if not df.empty:
+        client.insert_df(_QUALIFIED_TABLE, df)
+
+
+def insert_rows_mapping(
+    client: Client,
+    rows: Iterable[Mapping[str, object]],
+    column_names: Sequence[str] | None = None,
+) -> None:
+    """
+    Insert dict-like rows in chunks of INSERT_BATCH_ROWS.
+
+    Without column_names, the keys of the first row define the column order.
+    """
+    iterator = iter(rows)
+    chunk = list(islice(iterator, INSERT_BATCH_ROWS))
+    if chunk:
+        _insert_mapping_chunks(client, chunk, iterator, column_names)
+
+
+def insert_rows_sequence(
+    client: Client,
+    rows: Iterable[Sequence[object]],
+    column_names: Sequence[str],
+) -> None:
+    """Insert rows already in column_names order, in chunks of INSERT_BATCH_ROWS."""
+    iterator = iter(rows)
+    chunk = list(islice(iterator, INSERT_BATCH_ROWS))
+    if chunk:
+        _insert_sequence_chunks(client, chunk, iterator, column_names)
+
+
+def _insert_mapping_chunks(
+    client: Client,
+    chunk: list,
+    iterator: Iterator[Mapping[str, object]],
+    column_names: Sequence[str] | None,
+) -> None:
+    columns = list(column_names) if column_names is not None else list(chunk[0].keys())
+    # One C-level getter for all columns; a single column yields a bare value, not a tuple
+    getter = itemgetter(*columns)
+    single = len(columns) == 1
+    while chunk:
+        if single:
+            payload = [(getter(row),) for row in chunk]
         else:
-            if column_names is None:
-                raise ValueError("column_names must be provided for sequence rows")
-            payload = rows_list
+            payload = list(map(getter, chunk))
+        client.insert(_QUALIFIED_TABLE, payload, column_names=columns)
+        chunk = list(islice(iterator, INSERT_BATCH_ROWS))
 
-    if not payload:
-        return
 
-    client.insert(
-        f"{CLICKHOUSE_DB}.{CLICKHOUSE_TABLE}",
-        payload,
-        column_names=list(column_names),
-    )
+def _insert_sequence_chunks(
+    client: Client,
+    chunk: list,
+    iterator: Iterator[Sequence[object]],
+    column_names: Sequence[str] | None,
+) -> None:
+    if column_names is None:
+        raise ValueError("column_names must be provided for sequence rows")
+    columns = list(column_names)
+    while chunk:
+        client.insert(_QUALIFIED_TABLE, chunk, column_names=columns)
+        chunk = list(islice(iterator, INSERT_BATCH_ROWS))
 
 
 def fetch_latest(client: Client, limit: int = 10) -> pd.DataFrame:
-    query = f"""
-        SELECT *
-        FROM {CLICKHOUSE_DB}.{CLICKHOUSE_TABLE}
-        ORDER BY ts DESC
-        LIMIT {limit}
-    """
-    result = client.query(query)
+    result = client.query(_FETCH_LATEST_SQL, parameters={"limit": int(limit)})
     return pd.DataFrame(result.result_rows, columns=result.column_names)
 
 
@@ -119,7 +179,7 @@ def demo_flow() -> None:
         ("BTCUSDT", 65000.5, 0.01, datetime(2025, 10, 10, 15, 0, 0)),
         ("ETHUSDT", 2400.3, 1.5, datetime(2025, 10, 10, 15, 0, 1)),
     ]
-    insert_rows(
+    insert_rows_sequence(
         client,
         demo_rows,
         column_names=["symbol", "price", "volume", "ts"],
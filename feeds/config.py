@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 import yaml
 from pydantic import BaseModel, Field, HttpUrl, validator
 
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:  # pragma: no cover - PyYAML ohne libyaml
+    from yaml import SafeLoader as _YamlLoader  # type: ignore
+
 
 class OutputTargets(BaseModel):
     redis: bool = Field(default=True, description="Schreibt Events nach Redis.")
@@ -53,14 +59,16 @@ class ChannelConfig(BaseModel):
 
     def effective_outputs(self, defaults: "DefaultsConfig") -> OutputTargets:
         """Kombiniert Channel-Outputs mit den globalen Schaltern."""
-        return OutputTargets(
+        # Beide Quellen sind bereits validiert → ohne erneute Validierung zusammensetzen
+        return OutputTargets.model_construct(
             redis=self.outputs.redis and defaults.enable_redis,
             clickhouse=self.outputs.clickhouse and defaults.enable_clickhouse,
         )
 
     def has_any_output(self, defaults: "DefaultsConfig") -> bool:
-        effective = self.effective_outputs(defaults)
-        return effective.redis or effective.clickhouse
+        return (self.outputs.redis and defaults.enable_redis) or (
+            self.outputs.clickhouse and defaults.enable_clickhouse
+        )
 
 
 class ExchangeConfig(BaseModel):
@@ -97,10 +105,20 @@ class AppConfig(BaseModel):
 
 
 def load_config(path: str | Path) -> AppConfig:
-    """Lädt die YAML-Konfiguration und validiert sie über Pydantic."""
+    """
+    Lädt die YAML-Konfiguration und validiert sie über Pydantic.
+    Unveränderte Dateien (gleiche mtime) liefern das bereits geparste Objekt zurück.
+    """
     file_path = Path(path)
-    if not file_path.exists():
-        raise FileNotFoundError(f"Konfigdatei nicht gefunden: {file_path}")
-    with file_path.open("r", encoding="utf-8") as handle:
-        raw = yaml.safe_load(handle)
-    return AppConfig.parse_obj(raw)
+    try:
+        mtime_ns = file_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Konfigdatei nicht gefunden: {file_path}") from None
+    return _load_config_cached(str(file_path.resolve()), mtime_ns)
+
+
+@lru_cache(maxsize=8)
+def _load_config_cached(path: str, mtime_ns: int) -> AppConfig:
+    with open(path, "r", encoding="utf-8") as handle:
+        raw = yaml.load(handle, Loader=_YamlLoader)
+    return AppConfig.model_validate(raw)
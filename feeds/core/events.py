@@ -1,11 +1,10 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from decimal import Decimal
 from enum import Enum
 from typing import Dict, List, Optional
 
-from pydantic import BaseModel, Field, ConfigDict, validator
-
 
 class Channel(str, Enum):
     trades = "trades"
@@ -21,22 +20,21 @@ class Channel(str, Enum):
     advanced_metrics = "advanced_metrics"
 
 
-class BaseEvent(BaseModel):
+@dataclass(frozen=True, slots=True)
+class BaseEvent:
+    """
+    Normalisiertes Event. Schlanke frozen Dataclass statt Pydantic-Modell: Events entstehen
+    pro Tick, die Adapter liefern bereits normalisierte Werte (instrument upper-case aus der
+    ExchangeConfig, depth aus der validierten ChannelConfig, Preise/Mengen als Decimal).
+    """
+
     instrument: str
     channel: Channel
-    ts_event_ns: int = Field(..., ge=0)
-    ts_recv_ns: int = Field(..., ge=0)
-
-    model_config = ConfigDict(
-        frozen=True,
-        str_strip_whitespace=True,
-    )
-
-    @validator("instrument")
-    def _upper(cls, value: str) -> str:
-        return value.upper()
+    ts_event_ns: int
+    ts_recv_ns: int
 
 
+@dataclass(frozen=True, slots=True)
 class TradeEvent(BaseEvent):
     price: Decimal
     qty: Decimal
@@ -45,6 +43,7 @@ class TradeEvent(BaseEvent):
     is_aggressor: Optional[bool] = None
 
 
+@dataclass(frozen=True, slots=True)
 class AggTrade5sEvent(BaseEvent):
     interval_s: int
     window_start_ns: int
@@ -61,8 +60,11 @@ class AggTrade5sEvent(BaseEvent):
     sell_notional: Decimal
     first_trade_id: Optional[str] = None
     last_trade_id: Optional[str] = None
+    # True für gröbere Bars aus extras.rollups (interval_s > Basisfenster)
+    rollup: bool = False
 
 
+@dataclass(frozen=True, slots=True)
 class OrderBookDepthEvent(BaseEvent):
     depth: int
     bid_prices: List[Decimal]
@@ -70,26 +72,20 @@ class OrderBookDepthEvent(BaseEvent):
     ask_prices: List[Decimal]
     ask_qtys: List[Decimal]
 
-    @validator("depth")
-    def _supported_depth(cls, value: int) -> int:
-        if value not in {1, 5, 10, 20, 50, 100}:
-            raise ValueError("Nicht unterstützte Tiefe.")
-        return value
-
 
+@dataclass(frozen=True, slots=True)
 class OrderBookDiffEvent(BaseEvent):
+    """Level-Updates als parallele Listen (wie OrderBookDepthEvent); qty 0 = Level entfernen."""
+
     sequence: int
     prev_sequence: int
-    bids: Dict[Decimal, Decimal]
-    asks: Dict[Decimal, Decimal]
-
-    @validator("sequence", "prev_sequence")
-    def _positive(cls, value: int) -> int:
-        if value < 0:
-            raise ValueError("Sequenzen müssen >= 0 sein.")
-        return value
+    bid_prices: List[Decimal]
+    bid_qtys: List[Decimal]
+    ask_prices: List[Decimal]
+    ask_qtys: List[Decimal]
 
 
+@dataclass(frozen=True, slots=True)
 class LiquidationEvent(BaseEvent):
     side: str
     price: Decimal
@@ -98,6 +94,7 @@ class LiquidationEvent(BaseEvent):
     reason: Optional[str] = None
 
 
+@dataclass(frozen=True, slots=True)
 class KlineEvent(BaseEvent):
     interval: str
     open: Decimal
@@ -112,15 +109,18 @@ class KlineEvent(BaseEvent):
     is_closed: bool
 
 
+@dataclass(frozen=True, slots=True)
 class MarkPriceEvent(BaseEvent):
     mark_price: Decimal
     index_price: Optional[Decimal] = None
 
 
+@dataclass(frozen=True, slots=True)
 class FundingEvent(BaseEvent):
     funding_rate: Decimal
     next_funding_ts_ns: int
 
 
+@dataclass(frozen=True, slots=True)
 class AdvancedMetricsEvent(BaseEvent):
-    metrics: Dict[str, Decimal]
+    metrics: Dict[str, float]
@@ -15,33 +15,63 @@ class EventWriter(ABC):
         self.name = name
         self._flush_interval = flush_interval_ms / 1000
         self._flush_task: Optional[asyncio.Task[None]] = None
+        self._flush_signal = asyncio.Event()
+        self._stopping = False
         self._events_received = 0
         self._items_received = 0
         self._items_flushed = 0
 
     @abstractmethod
-    async def enqueue(self, event: BaseEvent) -> None:
+    def enqueue(self, event: BaseEvent) -> bool:
+        """
+        Event synchron puffern (Hot Path, kein await pro Event und Writer).
+        Rückgabe True: Puffer über der Hochwassermarke → Aufrufer sollte drain_if_full() awaiten.
+        """
         raise NotImplementedError
 
+    async def drain_if_full(self) -> None:
+        """Backpressure abbauen; Standard: nichts zu tun, der Writer flusht im Hintergrund."""
+
     @abstractmethod
     async def flush(self) -> None:
         raise NotImplementedError
 
     async def start(self) -> None:
+        # Neustart nach stop() (PipelineRouter gibt dafür bind() wieder frei)
+        self._stopping = False
+        self._flush_signal.clear()
         if self._flush_task is None and self._flush_interval > 0:
             self._flush_task = asyncio.create_task(self._auto_flush())
 
     async def stop(self) -> None:
+        # wait_for() verschluckt das cancel(), wenn das Signal im selben Moment gesetzt ist –
+        # das Flag beendet die Schleife trotzdem
+        self._stopping = True
         if self._flush_task:
             self._flush_task.cancel()
             with suppress(asyncio.CancelledError):
                 await self._flush_task
+            self._flush_task = None
         await self.flush()
 
     async def _auto_flush(self) -> None:
-        while True:
-            await asyncio.sleep(self._flush_interval)
-            await self.flush()
+        # Flush bei Signal (Puffer voll) sofort, sonst spätestens nach flush_interval –
+        # und dann nur, wenn überhaupt etwas gepuffert ist
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._flush_signal.wait(), timeout=self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_signal.clear()
+            if self.has_pending():
+                await self.flush()
+
+    def _signal_flush(self) -> None:
+        self._flush_signal.set()
+
+    def has_pending(self) -> bool:
+        """Ob gepufferte Daten auf einen Flush warten; Writer überschreiben das."""
+        return True
 
     def _record_event(self, items: int) -> None:
         self._events_received += 1
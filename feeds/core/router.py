@@ -1,59 +1,114 @@
 from __future__ import annotations
 
+from array import array
 from collections import defaultdict
-from typing import Dict, Iterable, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from .events import BaseEvent, Channel
 from .pipeline import EventWriter
 
+# Channel ist ein geschlossenes Enum → fester Index je Channel für die Zähler
+_CHANNELS: Tuple[Channel, ...] = tuple(Channel)
+_CHANNEL_INDEX: Dict[Channel, int] = {channel: idx for idx, channel in enumerate(_CHANNELS)}
+
 
 class PipelineRouter:
     """Leitet normalisierte Events an die konfigurierten Writer weiter."""
 
     def __init__(self) -> None:
         self._bindings: Dict[Channel, List[EventWriter]] = defaultdict(list)
-        self._events_by_channel: Dict[str, int] = defaultdict(int)
-        self._last_event_ns: Dict[tuple[str, str], int] = {}
-        self._last_recv_ns: Dict[tuple[str, str], int] = {}
+        # Hot Path: Writer-Tupel je Channel, per _CHANNEL_INDEX adressiert (kein Dict-Lookup);
+        # neu gebaut bei bind(), nach start() eingefroren
+        self._resolved: Tuple[Tuple[EventWriter, ...], ...] = ((),) * len(_CHANNELS)
+        self._frozen = False
+        # Alle Writer dedupliziert in Bind-Reihenfolge (start/stop/drain)
+        self._unique_writers: Tuple[EventWriter, ...] = ()
+        # Event-Zähler je Channel als zusammenhängendes uint64-Array (Index: _CHANNEL_INDEX)
+        self._events_by_channel = array("Q", [0] * len(_CHANNELS))
+        # channel -> instrument -> (ts_event_ns, ts_recv_ns): ein Dict-Update pro Event
+        self._last_ns: Dict[Channel, Dict[str, Tuple[int, int]]] = defaultdict(dict)
 
     def bind(self, channel: Channel, writer: EventWriter) -> None:
+        if self._frozen:
+            raise RuntimeError("Router läuft bereits – bind() nur vor start() möglich.")
         self._bindings[channel].append(writer)
+        self._resolved = tuple(tuple(self._bindings.get(ch, ())) for ch in _CHANNELS)
+        self._unique_writers = tuple(
+            dict.fromkeys(writer for writers in self._bindings.values() for writer in writers)
+        )
 
     def bindings_for(self, channel: Channel) -> Iterable[EventWriter]:
         return self._bindings.get(channel, [])
 
-    async def publish(self, event: BaseEvent) -> None:
-        writers = self._bindings.get(event.channel)
+    def publish_nowait(self, event: BaseEvent) -> bool:
+        """
+        Synchroner Hot Path: Event an alle Writer des Channels geben.
+        True, wenn ein Writer Backpressure meldet – dann sollte der Aufrufer drain() awaiten.
+        """
+        channel = event.channel
+        idx = _CHANNEL_INDEX[channel]
+        writers = self._resolved[idx]
         if not writers:
-            return
-        self._events_by_channel[event.channel.value] += 1
-        key = (event.channel.value, event.instrument)
-        self._last_event_ns[key] = event.ts_event_ns
-        self._last_recv_ns[key] = event.ts_recv_ns
+            return False
+        self._events_by_channel[idx] += 1
+        self._last_ns[channel][event.instrument] = (event.ts_event_ns, event.ts_recv_ns)
+        full = False
         for writer in writers:
-            await writer.enqueue(event)
+            if writer.enqueue(event):
+                full = True
+        return full
+
+    def publish_many_nowait(self, events: Iterable[BaseEvent]) -> bool:
+        """Mehrere Events eines Frames in einem Aufruf; Backpressure wie bei publish_nowait()."""
+        full = False
+        publish = self.publish_nowait
+        for event in events:
+            if publish(event):
+                full = True
+        return full
+
+    async def drain(self) -> None:
+        for writer in self._all_writers():
+            await writer.drain_if_full()
+
+    async def publish(self, event: BaseEvent) -> None:
+        if self.publish_nowait(event):
+            await self.drain()
+
+    async def publish_many(self, events: Iterable[BaseEvent]) -> None:
+        if self.publish_many_nowait(events):
+            await self.drain()
 
     async def start(self) -> None:
+        self._frozen = True
         for writer in self._all_writers():
             await writer.start()
 
     async def stop(self) -> None:
         for writer in self._all_writers():
             await writer.stop()
+        self._frozen = False
 
-    def _all_writers(self) -> Iterable[EventWriter]:
-        seen: set[EventWriter] = set()
-        for writers in self._bindings.values():
-            for writer in writers:
-                if writer not in seen:
-                    seen.add(writer)
-                    yield writer
+    def _all_writers(self) -> Tuple[EventWriter, ...]:
+        return self._unique_writers
 
     def stats(self) -> dict:
-        return {"events_by_channel": dict(self._events_by_channel)}
-
-    def last_event_snapshot(self) -> dict:
         return {
-            "event_ns": dict(self._last_event_ns),
-            "recv_ns": dict(self._last_recv_ns),
+            "events_by_channel": {
+                channel.value: count
+                for channel, count in zip(_CHANNELS, self._events_by_channel)
+                if count
+            }
         }
+
+    def last_event_snapshot(self) -> dict:
+        """Flache Sicht mit (channel, instrument)-Keys für Health-Checks."""
+        event_ns: Dict[tuple[str, str], int] = {}
+        recv_ns: Dict[tuple[str, str], int] = {}
+        for channel, by_instrument in self._last_ns.items():
+            channel_value = channel.value
+            for instrument, (ts_event_ns, ts_recv_ns) in by_instrument.items():
+                key = (channel_value, instrument)
+                event_ns[key] = ts_event_ns
+                recv_ns[key] = ts_recv_ns
+        return {"event_ns": event_ns, "recv_ns": recv_ns}
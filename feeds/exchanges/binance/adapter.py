@@ -4,36 +4,105 @@ import asyncio
 import json
 import logging
 import os
-from collections import defaultdict
-from collections import defaultdict
-from decimal import Decimal
-from typing import Dict, Iterable, List, Optional
+import re
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
 
 import websockets
-from pydantic import ValidationError
+
+try:
+    # orjson parst str/bytes direkt in C, deutlich schneller als json.loads pro Frame.
+    # Zustandslos und thread-safe: ein Loader auf Modulebene für alle Feeds und den Parse-Pool.
+    from orjson import loads as _json_loads  # type: ignore
+except ImportError:  # pragma: no cover
+    _json_loads = json.loads
 
 from ...config import ChannelConfig, ExchangeConfig
-from ...core.events import AggTrade5sEvent, Channel, OrderBookDepthEvent
+from ...core.events import AggTrade5sEvent, BaseEvent, Channel, OrderBookDepthEvent
 from ...core.router import PipelineRouter
 from ...utils import now_ns
-from ...utils.decimal import to_decimal
 from ..base import ExchangeFeed
 from .capabilities import BASE_URLS, SUPPORTED_CHANNELS
-from . import transforms
+from .transforms import (
+    SCALE_DIGITS,
+    depth_from_snapshot,
+    diff_from_stream,
+    from_scaled_int,
+    funding_from_stream,
+    kline_from_stream,
+    l1_from_stream,
+    liquidation_from_stream,
+    mark_price_from_stream,
+    metrics_from_state,
+    to_scaled_int,
+    trade_from_stream,
+)
+
+_NOTIONAL_DIGITS = 2 * SCALE_DIGITS
+
+_ZERO = Decimal("0")
+# Konstante Felder eines leeren Fensters (keine Trades) – einmal gebaut, je Event nur entpackt
+_EMPTY_BAR_FIELDS: Dict[str, object] = {
+    "channel": Channel.agg_trades_5s,
+    "open": _ZERO,
+    "high": _ZERO,
+    "low": _ZERO,
+    "close": _ZERO,
+    "volume": _ZERO,
+    "notional": _ZERO,
+    "trade_count": 0,
+    "buy_qty": _ZERO,
+    "sell_qty": _ZERO,
+    "buy_notional": _ZERO,
+    "sell_notional": _ZERO,
+    "first_trade_id": None,
+    "last_trade_id": None,
+}
 
 
 class _AggTradeBucket:
-    def __init__(
+    # Preise/Mengen als int mit SCALE_DIGITS Nachkommastellen, Notional mit 2 * SCALE_DIGITS
+    # (Produkt zweier skalierter Werte); Decimal erst beim Emit.
+    # __slots__: feste Attribut-Offsets statt Instanz-Dict im Update pro Trade
+    __slots__ = (
+        "window_idx",
+        "window_start_ns",
+        "open",
+        "high",
+        "low",
+        "close",
+        "volume",
+        "notional",
+        "trade_count",
+        "buy_qty",
+        "sell_qty",
+        "buy_notional",
+        "sell_notional",
+        "first_trade_id",
+        "last_trade_id",
+        "last_recv_ns",
+    )
+
+    def reset(
         self,
         *,
+        window_idx: int,
         window_start_ns: int,
-        price: Decimal,
-        qty: Decimal,
-        notional: Decimal,
-        trade_id: Optional[str],
+        price: int,
+        qty: int,
+        notional: int,
+        trade_id: Optional[int],
         is_sell: bool,
         ts_recv_ns: int,
     ) -> None:
+        # Öffnet den Bucket für ein neues Fenster; Instanzen werden über den Pool des
+        # Aggregators wiederverwendet statt je Fenster neu angelegt
+        self.window_idx = window_idx
         self.window_start_ns = window_start_ns
         self.open = price
         self.high = price
@@ -42,10 +111,10 @@ class _AggTradeBucket:
         self.volume = qty
         self.notional = notional
         self.trade_count = 1
-        self.buy_qty = Decimal("0")
-        self.sell_qty = Decimal("0")
-        self.buy_notional = Decimal("0")
-        self.sell_notional = Decimal("0")
+        self.buy_qty = 0
+        self.sell_qty = 0
+        self.buy_notional = 0
+        self.sell_notional = 0
         if is_sell:
             self.sell_qty = qty
             self.sell_notional = notional
@@ -59,10 +128,10 @@ class _AggTradeBucket:
     def update(
         self,
         *,
-        price: Decimal,
-        qty: Decimal,
-        notional: Decimal,
-        trade_id: Optional[str],
+        price: int,
+        qty: int,
+        notional: int,
+        trade_id: Optional[int],
         is_sell: bool,
         ts_recv_ns: int,
     ) -> None:
@@ -97,8 +166,11 @@ class AggTradeAggregator:
         self._interval_ns = int(interval_s * 1_000_000_000)
         self._symbols = symbols
         self._buckets: Dict[str, _AggTradeBucket] = {}
+        # Emittierte Buckets für das nächste Fenster; höchstens ein Bucket je Symbol im Umlauf
+        self._bucket_pool: List[_AggTradeBucket] = []
+        # Fenster als Index (ts_ns // interval_ns): eine Division pro Trade, Start-ns nur beim Öffnen
         self._last_emitted: Dict[str, int] = {}
-        self._last_flush_window_start: Optional[int] = None
+        self._last_flush_window: Optional[int] = None
         self._max_catchup_windows = max_catchup_windows
         self._late_grace_ns = max(0, int(late_grace_s) * 1_000_000_000)
         self._catchup_caps = 0
@@ -107,29 +179,35 @@ class AggTradeAggregator:
 
     def update(self, symbol: str, payload: dict, ts_recv_ns: int) -> List[AggTrade5sEvent]:
         ts_event_ms = int(payload.get("T") or payload.get("E") or 0)
-        ts_event_ns = ts_event_ms * 1_000_000
-        window_start_ns = (ts_event_ns // self._interval_ns) * self._interval_ns
+        window_idx = (ts_event_ms * 1_000_000) // self._interval_ns
         last_emitted = self._last_emitted.get(symbol)
-        if last_emitted is not None and window_start_ns <= last_emitted:
+        if last_emitted is not None and window_idx <= last_emitted:
+            # Verspätete/replayte Trades verwerfen, bevor Preis und Menge geparst werden
             self._late_trades += 1
             return []
-        price = to_decimal(payload["p"])
-        qty = to_decimal(payload["q"])
+        price = to_scaled_int(payload["p"])
+        qty = to_scaled_int(payload["q"])
         notional = price * qty
         is_sell = bool(payload.get("m"))
-        trade_id = payload.get("a") or payload.get("t")
+        # aggTrade-ID "a" ist ein int; als int im Bucket, str erst beim Emit
+        trade_id = payload.get("a")
+        if trade_id is None:
+            trade_id = payload.get("t")
         bucket = self._buckets.get(symbol)
         events: List[AggTrade5sEvent] = []
-        if bucket and bucket.window_start_ns != window_start_ns:
+        if bucket and bucket.window_idx != window_idx:
             events.append(self._emit(symbol, bucket))
             bucket = None
         if bucket is None:
-            bucket = _AggTradeBucket(
-                window_start_ns=window_start_ns,
+            pool = self._bucket_pool
+            bucket = pool.pop() if pool else _AggTradeBucket()
+            bucket.reset(
+                window_idx=window_idx,
+                window_start_ns=window_idx * self._interval_ns,
                 price=price,
                 qty=qty,
                 notional=notional,
-                trade_id=str(trade_id) if trade_id is not None else None,
+                trade_id=trade_id,
                 is_sell=is_sell,
                 ts_recv_ns=ts_recv_ns,
             )
@@ -139,7 +217,7 @@ class AggTradeAggregator:
                 price=price,
                 qty=qty,
                 notional=notional,
-                trade_id=str(trade_id) if trade_id is not None else None,
+                trade_id=trade_id,
                 is_sell=is_sell,
                 ts_recv_ns=ts_recv_ns,
             )
@@ -149,49 +227,228 @@ class AggTradeAggregator:
         watermark_ns = now_ns - self._late_grace_ns
         if watermark_ns <= 0:
             return []
-        last_emittable_window = ((watermark_ns // self._interval_ns) - 1) * self._interval_ns
-        if last_emittable_window < 0:
+        interval_ns = self._interval_ns
+        last_window = (watermark_ns // interval_ns) - 1
+        if last_window < 0:
             return []
-        if (
-            self._last_flush_window_start is not None
-            and last_emittable_window <= self._last_flush_window_start
-        ):
+        if self._last_flush_window is not None and last_window <= self._last_flush_window:
             return []
-        self._last_flush_window_start = last_emittable_window
+        self._last_flush_window = last_window
+        # Jedes Symbol emittiert pro Fenster einen (ggf. leeren) Bucket → ein Durchlauf je
+        # Fenstergrenze; Ticks innerhalb eines Fensters enden oben ohne Scan.
+        buckets = self._buckets
+        last_emitted_by_symbol = self._last_emitted
+        max_catchup = self._max_catchup_windows
+        emit = self._emit
+        interval_s = self.interval_s
         events: List[AggTrade5sEvent] = []
         for symbol in self._symbols:
-            last_emitted = self._last_emitted.get(symbol)
-            if last_emitted is None:
-                last_emitted = last_emittable_window - self._interval_ns
-            next_window = last_emitted + self._interval_ns
+            last_emitted = last_emitted_by_symbol.get(symbol)
+            next_window = last_window if last_emitted is None else last_emitted + 1
+            if next_window > last_window:
+                continue
+            bucket = buckets.get(symbol)
             emitted_windows = 0
-            while next_window <= last_emittable_window:
-                bucket = self._buckets.get(symbol)
-                if bucket and bucket.window_start_ns == next_window:
-                    events.append(self._emit(symbol, bucket))
-                    del self._buckets[symbol]
+            while True:
+                if bucket is not None and bucket.window_idx == next_window:
+                    events.append(emit(symbol, bucket))
+                    del buckets[symbol]
+                    bucket = None
                 else:
-                    events.append(self._emit_empty(symbol, next_window, now_ns))
-                self._last_emitted[symbol] = next_window
+                    window_start_ns = next_window * interval_ns
+                    events.append(
+                        AggTrade5sEvent(
+                            instrument=symbol,
+                            ts_event_ns=window_start_ns + interval_ns - 1,
+                            ts_recv_ns=now_ns,
+                            interval_s=interval_s,
+                            window_start_ns=window_start_ns,
+                            **_EMPTY_BAR_FIELDS,
+                        )
+                    )
                 emitted_windows += 1
-                if self._max_catchup_windows and emitted_windows >= self._max_catchup_windows:
-                    remaining = int((last_emittable_window - next_window) // self._interval_ns)
-                    if remaining > 0:
-                        self._catchup_caps += 1
-                        self._catchup_skipped += remaining
+                if next_window >= last_window:
                     break
-                next_window += self._interval_ns
+                if max_catchup and emitted_windows >= max_catchup:
+                    self._catchup_caps += 1
+                    self._catchup_skipped += last_window - next_window
+                    break
+                next_window += 1
+            last_emitted_by_symbol[symbol] = next_window
         return events
 
+    def next_flush_ns(self, now_ns: int) -> int:
+        """Zeitpunkt, ab dem flush() das nächste Fenster liefert (Fenstergrenze + Late-Grace)."""
+        interval_ns = self._interval_ns
+        grace_ns = self._late_grace_ns
+        return ((now_ns - grace_ns) // interval_ns + 1) * interval_ns + grace_ns
+
     def _emit(self, symbol: str, bucket: _AggTradeBucket) -> AggTrade5sEvent:
         window_end_ns = bucket.window_start_ns + self._interval_ns - 1
-        return AggTrade5sEvent(
+        first_trade_id = bucket.first_trade_id
+        last_trade_id = bucket.last_trade_id
+        event = AggTrade5sEvent(
             instrument=symbol,
             channel=Channel.agg_trades_5s,
             ts_event_ns=window_end_ns,
             ts_recv_ns=bucket.last_recv_ns,
             interval_s=self.interval_s,
             window_start_ns=bucket.window_start_ns,
+            open=from_scaled_int(bucket.open),
+            high=from_scaled_int(bucket.high),
+            low=from_scaled_int(bucket.low),
+            close=from_scaled_int(bucket.close),
+            volume=from_scaled_int(bucket.volume),
+            notional=from_scaled_int(bucket.notional, _NOTIONAL_DIGITS),
+            trade_count=bucket.trade_count,
+            buy_qty=from_scaled_int(bucket.buy_qty),
+            sell_qty=from_scaled_int(bucket.sell_qty),
+            buy_notional=from_scaled_int(bucket.buy_notional, _NOTIONAL_DIGITS),
+            sell_notional=from_scaled_int(bucket.sell_notional, _NOTIONAL_DIGITS),
+            first_trade_id=str(first_trade_id) if first_trade_id is not None else None,
+            last_trade_id=str(last_trade_id) if last_trade_id is not None else None,
+        )
+        # Event hält nur konvertierte Kopien → Bucket ist frei für das nächste Fenster
+        self._bucket_pool.append(bucket)
+        return event
+
+    def pop_catchup_stats(self) -> tuple[int, int]:
+        caps = self._catchup_caps
+        skipped = self._catchup_skipped
+        self._catchup_caps = 0
+        self._catchup_skipped = 0
+        return caps, skipped
+
+    def pop_late_stats(self) -> int:
+        late = self._late_trades
+        self._late_trades = 0
+        return late
+
+
+class _RollupBucket:
+    # Teilsummen eines groben Fensters aus Basis-Bars (Decimal, ein Merge je Basis-Bar)
+    __slots__ = (
+        "window_idx",
+        "open",
+        "high",
+        "low",
+        "close",
+        "volume",
+        "notional",
+        "trade_count",
+        "buy_qty",
+        "sell_qty",
+        "buy_notional",
+        "sell_notional",
+        "first_trade_id",
+        "last_trade_id",
+        "last_recv_ns",
+    )
+
+    def __init__(self, window_idx: int, bar: AggTrade5sEvent) -> None:
+        self.window_idx = window_idx
+        self.open = bar.open
+        self.high = bar.high
+        self.low = bar.low
+        self.close = bar.close
+        self.volume = bar.volume
+        self.notional = bar.notional
+        self.trade_count = bar.trade_count
+        self.buy_qty = bar.buy_qty
+        self.sell_qty = bar.sell_qty
+        self.buy_notional = bar.buy_notional
+        self.sell_notional = bar.sell_notional
+        self.first_trade_id = bar.first_trade_id
+        self.last_trade_id = bar.last_trade_id
+        self.last_recv_ns = bar.ts_recv_ns
+
+    def merge(self, bar: AggTrade5sEvent) -> None:
+        # min/max/Summen sind assoziativ → Basis-Bars lassen sich ohne die Trades kombinieren
+        if bar.high > self.high:
+            self.high = bar.high
+        if bar.low < self.low:
+            self.low = bar.low
+        self.close = bar.close
+        self.volume += bar.volume
+        self.notional += bar.notional
+        self.trade_count += bar.trade_count
+        self.buy_qty += bar.buy_qty
+        self.sell_qty += bar.sell_qty
+        self.buy_notional += bar.buy_notional
+        self.sell_notional += bar.sell_notional
+        if bar.last_trade_id is not None:
+            self.last_trade_id = bar.last_trade_id
+        if bar.ts_recv_ns > self.last_recv_ns:
+            self.last_recv_ns = bar.ts_recv_ns
+
+
+class AggTradeRollup:
+    """Fasst fertige Basis-Bars des AggTradeAggregator zu gröberen Fenstern zusammen (z.B. 5s → 1m).
+
+    Jede Basis-Bar wird einmal eingemischt; das grobe Fenster wird mit seiner letzten Basis-Bar
+    emittiert. Ein Fenster, in das der Feed mittendrin einsteigt, wird nicht als vollständig
+    ausgegeben.
+    """
+
+    def __init__(self, interval_s: int, base_interval_s: int) -> None:
+        if interval_s <= base_interval_s or interval_s % base_interval_s:
+            raise ValueError(
+                f"Rollup-Intervall {interval_s}s muss ein Vielfaches von {base_interval_s}s sein."
+            )
+        self.interval_s = interval_s
+        self._interval_ns = interval_s * 1_000_000_000
+        self._base_interval_ns = base_interval_s * 1_000_000_000
+        self._open: Dict[str, _RollupBucket] = {}
+        self._last_emitted: Dict[str, int] = {}
+
+    def add(self, bars: Iterable[BaseEvent]) -> List[AggTrade5sEvent]:
+        interval_ns = self._interval_ns
+        base_interval_ns = self._base_interval_ns
+        open_buckets = self._open
+        last_emitted_by_symbol = self._last_emitted
+        events: List[AggTrade5sEvent] = []
+        for bar in bars:
+            symbol = bar.instrument
+            window_idx = bar.window_start_ns // interval_ns
+            last_emitted = last_emitted_by_symbol.get(symbol)
+            if last_emitted is not None and window_idx <= last_emitted:
+                # Fenster schon ausgegeben (z.B. leere Flush-Bar nach der Bar aus update())
+                continue
+            bucket = open_buckets.get(symbol)
+            if bucket is None and last_emitted is None and bar.window_start_ns % interval_ns:
+                # Einstieg mitten im groben Fenster → erst ab dem nächsten vollständigen Fenster
+                last_emitted_by_symbol[symbol] = window_idx
+                continue
+            if bucket is not None and window_idx > bucket.window_idx:
+                events.append(self._emit(symbol, bucket))
+                last_emitted_by_symbol[symbol] = bucket.window_idx
+                del open_buckets[symbol]
+                bucket = None
+            if bar.trade_count:
+                if bucket is None:
+                    open_buckets[symbol] = bucket = _RollupBucket(window_idx, bar)
+                elif bucket.window_idx == window_idx:
+                    bucket.merge(bar)
+            if (bar.window_start_ns + base_interval_ns) % interval_ns == 0:
+                # Letzte Basis-Bar des groben Fensters → sofort abschließen
+                if bucket is not None and bucket.window_idx == window_idx:
+                    events.append(self._emit(symbol, bucket))
+                    del open_buckets[symbol]
+                else:
+                    events.append(self._emit_empty(symbol, window_idx, bar.ts_recv_ns))
+                last_emitted_by_symbol[symbol] = window_idx
+        return events
+
+    def _emit(self, symbol: str, bucket: _RollupBucket) -> AggTrade5sEvent:
+        window_start_ns = bucket.window_idx * self._interval_ns
+        return AggTrade5sEvent(
+            instrument=symbol,
+            channel=Channel.agg_trades_5s,
+            ts_event_ns=window_start_ns + self._interval_ns - 1,
+            ts_recv_ns=bucket.last_recv_ns,
+            interval_s=self.interval_s,
+            rollup=True,
+            window_start_ns=window_start_ns,
             open=bucket.open,
             high=bucket.high,
             low=bucket.low,
@@ -207,67 +464,131 @@ class AggTradeAggregator:
             last_trade_id=bucket.last_trade_id,
         )
 
-    def _emit_empty(self, symbol: str, window_start_ns: int, now_ns: int) -> AggTrade5sEvent:
-        window_end_ns = window_start_ns + self._interval_ns - 1
-        zero = Decimal("0")
+    def _emit_empty(self, symbol: str, window_idx: int, ts_recv_ns: int) -> AggTrade5sEvent:
+        window_start_ns = window_idx * self._interval_ns
         return AggTrade5sEvent(
             instrument=symbol,
-            channel=Channel.agg_trades_5s,
-            ts_event_ns=window_end_ns,
-            ts_recv_ns=now_ns,
+            ts_event_ns=window_start_ns + self._interval_ns - 1,
+            ts_recv_ns=ts_recv_ns,
             interval_s=self.interval_s,
+            rollup=True,
             window_start_ns=window_start_ns,
-            open=zero,
-            high=zero,
-            low=zero,
-            close=zero,
-            volume=zero,
-            notional=zero,
-            trade_count=0,
-            buy_qty=zero,
-            sell_qty=zero,
-            buy_notional=zero,
-            sell_notional=zero,
-            first_trade_id=None,
-            last_trade_id=None,
+            **_EMPTY_BAR_FIELDS,
         )
 
-    def pop_catchup_stats(self) -> tuple[int, int]:
-        caps = self._catchup_caps
-        skipped = self._catchup_skipped
-        self._catchup_caps = 0
-        self._catchup_skipped = 0
-        return caps, skipped
 
-    def pop_late_stats(self) -> int:
-        late = self._late_trades
-        self._late_trades = 0
-        return late
+async def _iter_frames(ws) -> AsyncIterator[bytes]:
+    # Wie ``async for raw in ws``, aber Text-Frames kommen als bytes ohne UTF-8-Dekodierung:
+    # der JSON-Parser validiert ohnehin selbst
+    recv = ws.recv
+    try:
+        while True:
+            yield await recv(decode=False)
+    except websockets.ConnectionClosedOK:
+        return
+
+
+# Fehler-Logs im Receive-Loop: die ersten _ERROR_LOG_BURST je Channel, danach jeder
+# _ERROR_LOG_EVERY-te. Gezählt wird immer (ws-errors in _log_stats), damit ein Schema-Bruch
+# beim Upstream nicht pro Nachricht Log-IO erzeugt.
+_ERROR_LOG_BURST = 10
+_ERROR_LOG_EVERY = 1000
+
+
+def _should_log_error(count: int) -> bool:
+    return count <= _ERROR_LOG_BURST or count % _ERROR_LOG_EVERY == 0
+
+
+# Frame ist gültiges JSON, aber ein Feld fehlt oder ist unplausibel (fehlendes "p",
+# "abc" als Preis, None statt Zahl) → validation_errors statt parse_errors
+_VALIDATION_ERRORS = (KeyError, ValueError, TypeError, InvalidOperation)
+
+# Max. Trades je Consumer-Durchlauf, bevor die fertigen Buckets gemeinsam publiziert werden
+_AGG_TRADES_BATCH = 512
+
+
+# Channel-Handler: (symbol, data, ts_recv_ns) -> (akzeptierte Nachrichten, Backpressure)
+_Handler = Callable[[str, dict, int], Tuple[int, bool]]
+
+# Feste Indizes für die Zähler-Arrays: Binance-Channels sind eine geschlossene Menge
+_CHANNEL_NAMES: Tuple[str, ...] = tuple(sorted(SUPPORTED_CHANNELS))
+_CHANNEL_IDS: Dict[str, int] = {name: idx for idx, name in enumerate(_CHANNEL_NAMES)}
+_MARK_PRICE_ID = _CHANNEL_IDS["mark_price"]
+_FUNDING_ID = _CHANNEL_IDS["funding"]
+_AGG_TRADES_ID = _CHANNEL_IDS["agg_trades_5s"]
 
 
+# Streams mit geringer Rate je Symbol: symbols_per_conn wird mindestens auf diesen Wert
+# angehoben, damit nicht für wenige Nachrichten je Sekunde mehrere Verbindungen offen sind.
+# 200 = Stream-Limit je Verbindung bei Binance Futures.
+_MIN_SYMBOLS_PER_CONN: Dict[str, int] = {
+    "mark_price": 200,
+    "liquidations": 200,
+}
+
+
+def _new_counters() -> array:
+    return array("Q", [0] * len(_CHANNEL_NAMES))
+
+
+def _counters_to_dict(counters: array) -> Dict[str, int]:
+    return {name: count for name, count in zip(_CHANNEL_NAMES, counters) if count}
+
+
+def _symbol_from_s(data: dict) -> str:
+    return data.get("s") or ""
+
+
+def _symbol_from_order(data: dict) -> str:
+    # forceOrder: Symbol steckt im Order-Objekt, nicht auf oberster Ebene
+    order = data.get("o")
+    return (order.get("s") or "") if order else ""
+
+
+def _symbol_fallback(data: dict) -> str:
+    return data.get("s") or data.get("symbol") or ""
+
+
+# Binance liefert das Symbol je Stream-Typ an fester Stelle (bereits upper-case)
+_SYMBOL_GETTERS: Dict[str, Callable[[dict], str]] = {
+    "trades": _symbol_from_s,
+    "agg_trades_5s": _symbol_from_s,
+    "l1": _symbol_from_s,
+    "ob_top5": _symbol_from_s,
+    "ob_top20": _symbol_from_s,
+    "ob_diff": _symbol_from_s,
+    "klines": _symbol_from_s,
+    "mark_price": _symbol_from_s,
+    "liquidations": _symbol_from_order,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class _ChannelPlan:
+    """Pro Verbindung feste Parameter eines Channel-Streams, einmal in start() aufgelöst."""
+
+    name: str
+    cid: int
+    stream_names: Tuple[str, ...]
+    url: str
+    handler: Optional[_Handler]
+    get_symbol: Callable[[dict], str]
+    is_agg_trades: bool
+    count_accepted: bool
+
+
+_INTERVAL_RE = re.compile(r"(\d+)\s*([smh])")
+_INTERVAL_FACTORS: Dict[str, int] = {"s": 1, "m": 60, "h": 3600}
+
+
+@lru_cache(maxsize=64)
 def _parse_interval_seconds(interval: Optional[str]) -> Optional[int]:
     if not interval:
         return None
-    text = interval.strip().lower()
-    if not text:
-        return None
-    num = ""
-    unit = ""
-    for ch in text:
-        if ch.isdigit():
-            num += ch
-        else:
-            unit += ch
-    if not num or not unit:
-        return None
-    try:
-        value = int(num)
-    except ValueError:
+    match = _INTERVAL_RE.fullmatch(interval.strip().lower())
+    if match is None:
         return None
-    factor = {"s": 1, "m": 60, "h": 3600}.get(unit.strip())
-    if not factor:
-        return None
-    return value * factor
+    return int(match.group(1)) * _INTERVAL_FACTORS[match.group(2)]
 
 
 class BinanceFeed(ExchangeFeed):
@@ -284,27 +605,50 @@ class BinanceFeed(ExchangeFeed):
             if isinstance(raw, int) and raw > 0:
                 self._ws_log_interval_s = raw
         self._advanced_channel = config.channels.get("advanced_metrics")
-        self._best_bid: Dict[str, Optional[Decimal]] = defaultdict(lambda: None)
-        self._best_ask: Dict[str, Optional[Decimal]] = defaultdict(lambda: None)
-        self._top5_state: Dict[str, Dict[str, List]] = defaultdict(dict)
+        self._advanced_enabled = self._compute_advanced_enabled()
+        # Symbole sind per ExchangeConfig bereits upper-case; Events nutzen diese Strings direkt
+        self._instruments: Dict[str, str] = {symbol: symbol for symbol in config.symbols}
+        # Mit allen konfigurierten Symbolen vorbelegt: im Betrieb nur Updates, kein Dict-Wachstum
+        # Best Bid/Ask nur für abgeleitete Kennzahlen → float statt Decimal
+        self._best_bid: Dict[str, Optional[float]] = dict.fromkeys(config.symbols)
+        self._best_ask: Dict[str, Optional[float]] = dict.fromkeys(config.symbols)
+        self._top5_state: Dict[str, Optional[Dict[str, List]]] = dict.fromkeys(config.symbols)
         self._mark_task_created = False
         self._agg_trades_task_created = False
         self._agg_trades_agg: Optional[AggTradeAggregator] = None
-        self._agg_trades_queue: Optional[asyncio.Queue] = None
+        self._agg_trades_rollups: Tuple[AggTradeRollup, ...] = ()
+        # Single-Producer/Single-Consumer im selben Loop: deque statt asyncio.Queue, das Event
+        # weckt den Consumer nur beim Übergang leer → nicht leer
+        self._agg_trades_ring: Optional[deque] = None
+        self._agg_trades_wake: Optional[asyncio.Event] = None
         self._agg_trades_enqueued = 0
         self._agg_trades_processed = 0
         self._agg_trades_dropped = 0
         self._agg_trades_emitted = 0
+        # Rollup-Bars getrennt zählen: ws_msgs/emit bleiben bei den Basis-Bars
+        self._agg_trades_rolled = 0
         self._agg_trades_queue_max = int(os.getenv("AGG_TRADE_QUEUE_MAX", "20000"))
         self._agg_trades_max_catchup = int(os.getenv("AGG_TRADE_MAX_CATCHUP_WINDOWS", "120"))
         self._agg_trades_late_grace_s = int(os.getenv("AGG_TRADE_LATE_GRACE_S", "2"))
-        self._msg_counts: Dict[str, int] = defaultdict(int)
-        self._conn_counts: Dict[str, int] = defaultdict(int)
-        self._disc_counts: Dict[str, int] = defaultdict(int)
-        self._parse_errors: Dict[str, int] = defaultdict(int)
-        self._validation_errors: Dict[str, int] = defaultdict(int)
+        # Optional: JSON-Parsing der Channel-Frames in einen Thread-Pool auslagern (0 = inline)
+        self._parse_workers = int(os.getenv("WS_PARSE_WORKERS", "0"))
+        self._parse_pool: Optional[ThreadPoolExecutor] = None
+        # uint64-Zähler je Channel, Index über _CHANNEL_IDS
+        self._msg_counts = _new_counters()
+        self._conn_counts = _new_counters()
+        self._disc_counts = _new_counters()
+        self._parse_errors = _new_counters()
+        self._validation_errors = _new_counters()
+        self._dispatch = self._build_dispatch()
 
     async def start(self) -> None:
+        # Outputs stehen nach set_global_outputs() fest → Metrics-Schalter einmalig auflösen
+        self._advanced_enabled = self._compute_advanced_enabled()
+        if self._parse_workers > 0 and self._parse_pool is None:
+            self._parse_pool = ThreadPoolExecutor(
+                max_workers=self._parse_workers,
+                thread_name_prefix="binance-parse",
+            )
         for channel_name, channel_conf in self.config.channels.items():
             if not channel_conf.enabled:
                 continue
@@ -332,78 +676,168 @@ class BinanceFeed(ExchangeFeed):
                         max_catchup_windows=self._agg_trades_max_catchup,
                         late_grace_s=self._agg_trades_late_grace_s,
                     )
-                    self._agg_trades_queue = asyncio.Queue(maxsize=self._agg_trades_queue_max)
-            chunks = self._symbol_chunks(channel_name)
-            for symbols in chunks:
-                self.register_task(self._run_channel(channel_name, channel_conf, symbols))
+                    self._agg_trades_rollups = self._build_rollups(channel_conf, interval_s)
+                    self._agg_trades_ring = deque()
+                    self._agg_trades_wake = asyncio.Event()
+            for symbols in self._symbol_chunks(channel_name):
+                plan = self._build_channel_plan(channel_name, channel_conf, symbols)
+                if plan is not None:
+                    self.register_task(self._run_channel(plan))
         if self._agg_trades_agg and not self._agg_trades_task_created:
             self.register_task(self._run_agg_trades_consumer())
             self.register_task(self._run_agg_trades_flush())
             self._agg_trades_task_created = True
         self.register_task(self._log_stats())
 
-    async def _run_channel(self, channel_name: str, channel_conf: ChannelConfig, symbols: List[str]):
-        stream_names = list(self._iter_streams(channel_name, channel_conf, symbols))
+    def _build_rollups(
+        self, channel_conf: ChannelConfig, base_interval_s: int
+    ) -> Tuple[AggTradeRollup, ...]:
+        # extras.rollups: gröbere Fenster aus den Basis-Bars, z.B. ["1m", "5m"]
+        raw = channel_conf.extras.get("rollups") or ()
+        if isinstance(raw, str):
+            raw = (raw,)
+        rollups = []
+        for entry in raw:
+            interval_s = _parse_interval_seconds(str(entry))
+            if interval_s is None:
+                raise ValueError(f"Ungültiges Rollup-Intervall für agg_trades_5s: {entry!r}")
+            rollups.append(AggTradeRollup(interval_s, base_interval_s))
+        return tuple(rollups)
+
+    def _add_rollups(self, events: List[BaseEvent]) -> None:
+        # Rollups sehen nur die Basis-Bars, ihre Bars werden gemeinsam mit diesen publiziert
+        rolled = [bar for rollup in self._agg_trades_rollups for bar in rollup.add(events)]
+        if rolled:
+            events.extend(rolled)
+            self._agg_trades_rolled += len(rolled)
+
+    def _compute_advanced_enabled(self) -> bool:
+        channel = self._advanced_channel
+        return bool(channel and channel.enabled and self.has_outputs(channel))
+
+    async def stop(self) -> None:
+        await super().stop()
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown(wait=False, cancel_futures=True)
+            self._parse_pool = None
+
+    def _build_channel_plan(
+        self, channel_name: str, channel_conf: ChannelConfig, symbols: List[str]
+    ) -> Optional[_ChannelPlan]:
+        stream_names = tuple(self._iter_streams(channel_name, channel_conf, symbols))
         if not stream_names:
-            return
-        url = self._stream_url(stream_names)
-        while not self._stop_event.is_set():
+            return None
+        is_agg_trades = channel_name == "agg_trades_5s"
+        handler = self._dispatch.get(channel_name)
+        if handler is None and not is_agg_trades:
+            self._logger.warning("kein Handler für channel=%s", channel_name)
+            return None
+        return _ChannelPlan(
+            name=channel_name,
+            cid=_CHANNEL_IDS[channel_name],
+            stream_names=stream_names,
+            url=self._stream_url(list(stream_names)),
+            handler=handler,
+            get_symbol=_SYMBOL_GETTERS.get(channel_name, _symbol_fallback),
+            is_agg_trades=is_agg_trades,
+            count_accepted=channel_name == "klines",
+        )
+
+    async def _run_channel(self, plan: _ChannelPlan):
+        # Pro Verbindung konstant: Plan-Felder und Lookups einmal in Locals binden
+        channel_name = plan.name
+        stream_names = plan.stream_names
+        url = plan.url
+        is_agg_trades = plan.is_agg_trades
+        count_accepted = plan.count_accepted
+        handler = plan.handler
+        cid = plan.cid
+        agg_ring = self._agg_trades_ring
+        agg_wake = self._agg_trades_wake
+        agg_max = self._agg_trades_queue_max
+        instruments = self._instruments
+        get_symbol = plan.get_symbol
+        msg_counts = self._msg_counts
+        loads = _json_loads
+        clock = now_ns
+        parse_pool = self._parse_pool
+        loop = asyncio.get_running_loop()
+        drain = self.router.drain
+        warn = self._logger.warning
+        stop_is_set = self._stop_event.is_set
+        while not stop_is_set():
             try:
-                self._conn_counts[channel_name] += 1
+                self._conn_counts[cid] += 1
                 self._logger.info(
                     "connect channel=%s streams=%s",
                     channel_name,
                     len(stream_names),
                 )
-                async with websockets.connect(url, ping_interval=20) as ws:
+                async with websockets.connect(url, ping_interval=20, compression=None) as ws:
                     self._logger.info("connected channel=%s", channel_name)
-                    async for raw in ws:
-                        if self._stop_event.is_set():
+                    async for raw in _iter_frames(ws):
+                        if stop_is_set():
                             break
-                        ts_recv_ns = now_ns()
-                        payload = json.loads(raw)
-                        data = payload.get("data", payload)
-                        symbol = (data.get("s") or data.get("symbol") or "").upper()
+                        ts_recv_ns = clock()
+                        try:
+                            if parse_pool is None:
+                                payload = loads(raw)
+                            else:
+                                # Loop bedient andere Verbindungen, während der Frame im Pool geparst wird
+                                payload = await loop.run_in_executor(parse_pool, loads, raw)
+                            # _stream_url nutzt immer /stream?streams= → Payload steckt stets in "data";
+                            # Frames ohne Hülle (z.B. {"result":null,"id":1}) zählen als parse_error
+                            data = payload["data"]
+                            raw_symbol = get_symbol(data)
+                            # Treffer im Normalfall; upper() nur für unerwartete Symbole
+                            symbol = instruments.get(raw_symbol) or raw_symbol.upper()
+                        except Exception as exc:
+                            # Kaputter/unbekannter Frame darf die Verbindung nicht abreißen
+                            self._parse_errors[cid] += 1
+                            if _should_log_error(self._parse_errors[cid]):
+                                warn("parse_error channel=%s error=%s", channel_name, exc)
+                            continue
                         if not symbol:
                             continue
                         try:
-                            if channel_name == "agg_trades_5s":
-                                if self._agg_trades_queue is None:
+                            if is_agg_trades:
+                                if agg_ring is None:
                                     continue
                                 self._agg_trades_enqueued += 1
-                                try:
-                                    self._agg_trades_queue.put_nowait((symbol, data, ts_recv_ns))
-                                except asyncio.QueueFull:
+                                if 0 < agg_max <= len(agg_ring):
+                                    # Wie Queue.put_nowait bei voller Queue: neuester Trade fällt weg
                                     self._agg_trades_dropped += 1
+                                    continue
+                                if not agg_ring:
+                                    agg_wake.set()
+                                agg_ring.append((symbol, data, ts_recv_ns))
                                 continue
-                            accepted = await self._handle_message(
-                                channel_name,
-                                symbol,
-                                data,
-                                channel_conf,
-                                ts_recv_ns,
-                            )
-                            if channel_name == "klines":
+                            accepted, full = handler(symbol, data, ts_recv_ns)
+                            if count_accepted:
                                 if accepted:
-                                    self._msg_counts[channel_name] += accepted
+                                    msg_counts[cid] += accepted
                             else:
-                                self._msg_counts[channel_name] += 1
-                        except ValidationError as exc:
-                            self._validation_errors[channel_name] += 1
-                            self._logger.warning(
-                                "validation_error channel=%s error=%s",
-                                channel_name,
-                                exc,
-                            )
+                                msg_counts[cid] += 1
+                            if full:
+                                await drain()
+                        except _VALIDATION_ERRORS as exc:
+                            self._validation_errors[cid] += 1
+                            if _should_log_error(self._validation_errors[cid]):
+                                warn(
+                                    "validation_error channel=%s error=%s",
+                                    channel_name,
+                                    exc,
+                                )
                         except Exception as exc:
-                            self._parse_errors[channel_name] += 1
-                            self._logger.warning(
-                                "parse_error channel=%s error=%s",
-                                channel_name,
-                                exc,
-                            )
+                            self._parse_errors[cid] += 1
+                            if _should_log_error(self._parse_errors[cid]):
+                                warn(
+                                    "parse_error channel=%s error=%s",
+                                    channel_name,
+                                    exc,
+                                )
             except Exception as exc:
-                self._disc_counts[channel_name] += 1
+                self._disc_counts[cid] += 1
                 self._logger.warning("disconnect channel=%s error=%s", channel_name, exc)
                 await asyncio.sleep(1.0)
 
@@ -414,78 +848,114 @@ class BinanceFeed(ExchangeFeed):
         url = self._stream_url(stream_names)
         funding_conf = self.config.channels.get("funding", ChannelConfig(enabled=False))
         mark_conf = self.config.channels.get("mark_price", ChannelConfig(enabled=False))
+        mark_enabled = mark_conf.enabled and self.has_outputs(mark_conf)
         funding_enabled = funding_conf.enabled and self.has_outputs(funding_conf)
-        while not self._stop_event.is_set():
+        if not (mark_enabled or funding_enabled):
+            # Kein Ziel für Mark- oder Funding-Events → Stream gar nicht erst verbinden und parsen
+            self._logger.info("skip channel=mark_price: keine aktiven Outputs für mark_price/funding")
+            return
+        instruments = self._instruments
+        loads = _json_loads
+        clock = now_ns
+        warn = self._logger.warning
+        stop_is_set = self._stop_event.is_set
+        while not stop_is_set():
             try:
-                self._conn_counts["mark_price"] += 1
+                self._conn_counts[_MARK_PRICE_ID] += 1
                 if funding_enabled:
-                    self._conn_counts["funding"] += 1
+                    self._conn_counts[_FUNDING_ID] += 1
                 self._logger.info(
                     "connect channel=mark_price streams=%s",
                     len(stream_names),
                 )
-                async with websockets.connect(url, ping_interval=20) as ws:
+                async with websockets.connect(url, ping_interval=20, compression=None) as ws:
                     self._logger.info("connected channel=mark_price")
-                    async for raw in ws:
-                        if self._stop_event.is_set():
+                    async for raw in _iter_frames(ws):
+                        if stop_is_set():
                             break
-                        self._msg_counts["mark_price"] += 1
+                        self._msg_counts[_MARK_PRICE_ID] += 1
                         if funding_enabled:
-                            self._msg_counts["funding"] += 1
-                        ts_recv_ns = now_ns()
-                        payload = json.loads(raw)
-                        data = payload.get("data", payload)
-                        symbol = (data.get("s") or data.get("symbol") or "").upper()
+                            self._msg_counts[_FUNDING_ID] += 1
+                        ts_recv_ns = clock()
+                        try:
+                            payload = loads(raw)
+                            data = payload["data"]
+                            raw_symbol = _symbol_from_s(data)
+                            symbol = instruments.get(raw_symbol) or raw_symbol.upper()
+                        except Exception as exc:
+                            self._parse_errors[_MARK_PRICE_ID] += 1
+                            if funding_enabled:
+                                self._parse_errors[_FUNDING_ID] += 1
+                            if _should_log_error(self._parse_errors[_MARK_PRICE_ID]):
+                                warn("parse_error channel=mark_price error=%s", exc)
+                            continue
                         if not symbol:
                             continue
-                        if mark_conf.enabled and self.has_outputs(mark_conf):
+                        # Mark- und Funding-Event stammen aus demselben Frame → gemeinsam publishen
+                        outs: List[BaseEvent] = []
+                        if mark_enabled:
                             try:
-                                mark_event = transforms.mark_price_from_stream(
-                                    symbol,
-                                    data,
-                                    ts_recv_ns,
+                                outs.append(
+                                    mark_price_from_stream(
+                                        symbol,
+                                        data,
+                                        ts_recv_ns,
+                                    )
                                 )
-                                await self.router.publish(mark_event)
-                            except ValidationError as exc:
-                                self._validation_errors["mark_price"] += 1
-                                self._logger.warning("validation_error channel=mark_price error=%s", exc)
+                            except _VALIDATION_ERRORS as exc:
+                                self._validation_errors[_MARK_PRICE_ID] += 1
+                                if _should_log_error(self._validation_errors[_MARK_PRICE_ID]):
+                                    warn("validation_error channel=mark_price error=%s", exc)
                             except Exception as exc:
-                                self._parse_errors["mark_price"] += 1
-                                self._logger.warning("parse_error channel=mark_price error=%s", exc)
+                                self._parse_errors[_MARK_PRICE_ID] += 1
+                                if _should_log_error(self._parse_errors[_MARK_PRICE_ID]):
+                                    warn("parse_error channel=mark_price error=%s", exc)
                         if funding_enabled:
                             try:
-                                funding_event = transforms.funding_from_stream(
-                                    symbol,
-                                    data,
-                                    ts_recv_ns,
+                                outs.append(
+                                    funding_from_stream(
+                                        symbol,
+                                        data,
+                                        ts_recv_ns,
+                                    )
                                 )
-                                await self.router.publish(funding_event)
-                            except ValidationError as exc:
-                                self._validation_errors["funding"] += 1
-                                self._logger.warning("validation_error channel=funding error=%s", exc)
+                            except _VALIDATION_ERRORS as exc:
+                                self._validation_errors[_FUNDING_ID] += 1
+                                if _should_log_error(self._validation_errors[_FUNDING_ID]):
+                                    warn("validation_error channel=funding error=%s", exc)
                             except Exception as exc:
-                                self._parse_errors["funding"] += 1
-                                self._logger.warning("parse_error channel=funding error=%s", exc)
+                                self._parse_errors[_FUNDING_ID] += 1
+                                if _should_log_error(self._parse_errors[_FUNDING_ID]):
+                                    warn("parse_error channel=funding error=%s", exc)
+                        if outs and self.router.publish_many_nowait(outs):
+                            await self.router.drain()
             except Exception as exc:
-                self._disc_counts["mark_price"] += 1
+                self._disc_counts[_MARK_PRICE_ID] += 1
                 if funding_enabled:
-                    self._disc_counts["funding"] += 1
+                    self._disc_counts[_FUNDING_ID] += 1
                 self._logger.warning("disconnect channel=mark_price error=%s", exc)
                 await asyncio.sleep(1.0)
 
     async def _run_agg_trades_flush(self) -> None:
-        if not self._agg_trades_agg:
+        agg = self._agg_trades_agg
+        if not agg:
             return
-        channel_name = "agg_trades_5s"
         while not self._stop_event.is_set():
-            await asyncio.sleep(1.0)
-            events = self._agg_trades_agg.flush(now_ns())
+            # Genau bis zur nächsten Fenstergrenze + Late-Grace schlafen statt sekündlich zu pollen;
+            # stop() bricht den Schlaf per Task-Cancel ab
+            current_ns = now_ns()
+            delay_ns = agg.next_flush_ns(current_ns) - current_ns
+            await asyncio.sleep(delay_ns / 1_000_000_000)
+            events = agg.flush(now_ns())
             if events:
-                for event in events:
-                    await self.router.publish(event)
-                self._msg_counts[channel_name] += len(events)
-                self._agg_trades_emitted += len(events)
-            caps, skipped = self._agg_trades_agg.pop_catchup_stats()
+                base_count = len(events)
+                if self._agg_trades_rollups:
+                    self._add_rollups(events)
+                if self.router.publish_many_nowait(events):
+                    await self.router.drain()
+                self._msg_counts[_AGG_TRADES_ID] += base_count
+                self._agg_trades_emitted += base_count
+            caps, skipped = agg.pop_catchup_stats()
             if caps:
                 self._logger.warning(
                     "agg_trades_5s catchup capped symbols=%s skipped_windows=%s",
@@ -494,59 +964,111 @@ class BinanceFeed(ExchangeFeed):
                 )
 
     async def _run_agg_trades_consumer(self) -> None:
-        if not self._agg_trades_agg or self._agg_trades_queue is None:
+        agg = self._agg_trades_agg
+        ring = self._agg_trades_ring
+        wake = self._agg_trades_wake
+        if not agg or ring is None or wake is None:
             return
-        while not self._stop_event.is_set():
-            symbol, payload, ts_recv_ns = await self._agg_trades_queue.get()
-            try:
-                events = self._agg_trades_agg.update(symbol, payload, ts_recv_ns)
+        popleft = ring.popleft
+        update = agg.update
+        rollups = self._agg_trades_rollups
+        parse_errors = self._parse_errors
+        validation_errors = self._validation_errors
+        warn = self._logger.warning
+        stop_is_set = self._stop_event.is_set
+        while not stop_is_set():
+            if not ring:
+                wake.clear()
+                await wake.wait()
+                continue
+            # Alles Angesammelte in Batches abarbeiten: ein publish_many je Batch,
+            # ein await nur bei Backpressure
+            while ring:
+                batch = min(len(ring), _AGG_TRADES_BATCH)
+                events: List[BaseEvent] = []
+                for _ in range(batch):
+                    symbol, payload, ts_recv_ns = popleft()
+                    try:
+                        emitted = update(symbol, payload, ts_recv_ns)
+                    except _VALIDATION_ERRORS as exc:
+                        # Defekter Trade (z.B. ohne "p"/"q") darf den Consumer nicht beenden
+                        validation_errors[_AGG_TRADES_ID] += 1
+                        if _should_log_error(validation_errors[_AGG_TRADES_ID]):
+                            warn("validation_error channel=agg_trades_5s error=%s", exc)
+                        continue
+                    except Exception as exc:
+                        parse_errors[_AGG_TRADES_ID] += 1
+                        if _should_log_error(parse_errors[_AGG_TRADES_ID]):
+                            warn("parse_error channel=agg_trades_5s error=%s", exc)
+                        continue
+                    if emitted:
+                        events.extend(emitted)
+                self._agg_trades_processed += batch
                 if events:
-                    for event in events:
-                        await self.router.publish(event)
-                    self._msg_counts["agg_trades_5s"] += len(events)
-                    self._agg_trades_emitted += len(events)
-                self._agg_trades_processed += 1
-            finally:
-                self._agg_trades_queue.task_done()
+                    base_count = len(events)
+                    if rollups:
+                        self._add_rollups(events)
+                    if self.router.publish_many_nowait(events):
+                        await self.router.drain()
+                    self._msg_counts[_AGG_TRADES_ID] += base_count
+                    self._agg_trades_emitted += base_count
 
     async def _log_stats(self) -> None:
-        last_msgs: Dict[str, int] = defaultdict(int)
-        last_conns: Dict[str, int] = defaultdict(int)
-        last_discs: Dict[str, int] = defaultdict(int)
-        last_parse: Dict[str, int] = defaultdict(int)
-        last_validation: Dict[str, int] = defaultdict(int)
-        last_agg = {
-            "enqueued": 0,
-            "processed": 0,
-            "dropped": 0,
-            "emitted": 0,
-        }
+        counters = (
+            self._msg_counts,
+            self._conn_counts,
+            self._disc_counts,
+            self._parse_errors,
+            self._validation_errors,
+        )
+        last = tuple(_new_counters() for _ in counters)
+        last_agg = (0, 0, 0, 0)
         interval_s = max(1, int(self._ws_log_interval_s))
+        logger = self._logger
+        info = logger.info
+        warn = logger.warning
         while not self._stop_event.is_set():
             await asyncio.sleep(interval_s)
+            # Level je Zyklus prüfen: ist INFO/WARNING gefiltert, werden die Zeilen gar nicht erst gebaut
+            info_enabled = logger.isEnabledFor(logging.INFO)
+            warn_enabled = logger.isEnabledFor(logging.WARNING)
+            # Ein Snapshot je Zyklus, alle Deltas in einem Durchlauf; der Snapshot wird die neue Basis
+            snapshot = tuple(counter[:] for counter in counters)
+            msgs, conns, discs, parse, validation = snapshot
+            last_msgs, last_conns, last_discs, last_parse, last_validation = last
             lines = []
-            all_channels = set(self._msg_counts.keys()) | set(self._conn_counts.keys()) | set(self._disc_counts.keys())
-            all_channels |= set(self._parse_errors.keys()) | set(self._validation_errors.keys())
-            for channel in sorted(all_channels):
-                msg_delta = self._msg_counts[channel] - last_msgs.get(channel, 0)
-                conn_delta = self._conn_counts[channel] - last_conns.get(channel, 0)
-                disc_delta = self._disc_counts[channel] - last_discs.get(channel, 0)
-                parse_delta = self._parse_errors[channel] - last_parse.get(channel, 0)
-                val_delta = self._validation_errors[channel] - last_validation.get(channel, 0)
-                if msg_delta or conn_delta or disc_delta:
-                    lines.append(
-                        f"{channel}: msgs+{msg_delta}/{interval_s}s conns+{conn_delta} discs+{disc_delta}"
-                    )
+            err_lines = []
+            for idx, channel in enumerate(_CHANNEL_NAMES):
+                if info_enabled:
+                    msg_delta = msgs[idx] - last_msgs[idx]
+                    conn_delta = conns[idx] - last_conns[idx]
+                    disc_delta = discs[idx] - last_discs[idx]
+                    if msg_delta or conn_delta or disc_delta:
+                        lines.append(
+                            f"{channel}: msgs+{msg_delta}/{interval_s}s conns+{conn_delta} discs+{disc_delta}"
+                        )
+                if warn_enabled:
+                    parse_delta = parse[idx] - last_parse[idx]
+                    val_delta = validation[idx] - last_validation[idx]
+                    if parse_delta or val_delta:
+                        err_lines.append(
+                            f"{channel}: parse_error+{parse_delta}/10s validation_error+{val_delta}/10s"
+                        )
             if lines:
-                self._logger.info("ws-stats %s", " | ".join(lines))
-
-            if self._agg_trades_queue is not None:
-                pending = self._agg_trades_queue.qsize()
-                enq_delta = self._agg_trades_enqueued - last_agg["enqueued"]
-                proc_delta = self._agg_trades_processed - last_agg["processed"]
-                drop_delta = self._agg_trades_dropped - last_agg["dropped"]
-                emit_delta = self._agg_trades_emitted - last_agg["emitted"]
-                self._logger.info(
+                info("ws-stats %s", " | ".join(lines))
+
+            if self._agg_trades_ring is not None:
+                pending = len(self._agg_trades_ring)
+                agg = (
+                    self._agg_trades_enqueued,
+                    self._agg_trades_processed,
+                    self._agg_trades_dropped,
+                    self._agg_trades_emitted,
+                )
+                enq_delta, proc_delta, drop_delta, emit_delta = (
+                    cur - prev for cur, prev in zip(agg, last_agg)
+                )
+                info(
                     "agg-trades backlog=%s enq+%s/%ss proc+%s/%ss emit+%s/%ss drop+%s/%ss",
                     pending,
                     enq_delta,
@@ -561,88 +1083,85 @@ class BinanceFeed(ExchangeFeed):
                 if self._agg_trades_agg:
                     late = self._agg_trades_agg.pop_late_stats()
                     if late:
-                        self._logger.warning("agg-trades late_trades+%s/%ss", late, interval_s)
-                last_agg["enqueued"] = self._agg_trades_enqueued
-                last_agg["processed"] = self._agg_trades_processed
-                last_agg["dropped"] = self._agg_trades_dropped
-                last_agg["emitted"] = self._agg_trades_emitted
+                        warn("agg-trades late_trades+%s/%ss", late, interval_s)
+                last_agg = agg
 
-            err_lines = []
-            for channel in sorted(all_channels):
-                parse_delta = self._parse_errors[channel] - last_parse.get(channel, 0)
-                val_delta = self._validation_errors[channel] - last_validation.get(channel, 0)
-                if parse_delta or val_delta:
-                    err_lines.append(
-                        f"{channel}: parse_error+{parse_delta}/10s validation_error+{val_delta}/10s"
-                    )
             if err_lines:
-                self._logger.warning("ws-errors %s", " | ".join(err_lines))
+                warn("ws-errors %s", " | ".join(err_lines))
 
-            for channel in sorted(all_channels):
-                last_msgs[channel] = self._msg_counts[channel]
-                last_conns[channel] = self._conn_counts[channel]
-                last_discs[channel] = self._disc_counts[channel]
-                last_parse[channel] = self._parse_errors[channel]
-                last_validation[channel] = self._validation_errors[channel]
+            last = snapshot
 
     def stats(self) -> dict:
         return {
             "exchange": self.exchange_name,
-            "ws_msgs": dict(self._msg_counts),
-            "ws_conns": dict(self._conn_counts),
-            "ws_discs": dict(self._disc_counts),
-            "parse_errors": dict(self._parse_errors),
-            "validation_errors": dict(self._validation_errors),
+            "ws_msgs": _counters_to_dict(self._msg_counts),
+            "ws_conns": _counters_to_dict(self._conn_counts),
+            "ws_discs": _counters_to_dict(self._disc_counts),
+            "parse_errors": _counters_to_dict(self._parse_errors),
+            "validation_errors": _counters_to_dict(self._validation_errors),
+            # Router/Writer zählen Rollup-Bars unter agg_trades_5s mit; run_feeds zieht sie ab
+            "rollup_bars": (
+                {Channel.agg_trades_5s.value: self._agg_trades_rolled} if self._agg_trades_rolled else {}
+            ),
         }
 
-    async def _handle_message(
-        self,
-        channel_name: str,
-        symbol: str,
-        payload: dict,
-        channel_conf: ChannelConfig,
-        ts_recv_ns: int,
-    ) -> int:
-        if channel_name == "trades":
-            event = transforms.trade_from_stream(symbol, payload, ts_recv_ns)
-            await self.router.publish(event)
-            return 1
-        elif channel_name == "l1":
-            event = transforms.l1_from_stream(symbol, payload, ts_recv_ns)
-            await self._handle_depth_event(symbol, event)
-            return 1
-        elif channel_name in {"ob_top5", "ob_top20"}:
-            depth = channel_conf.depth or (5 if channel_name == "ob_top5" else 20)
+    def _build_dispatch(self) -> Dict[str, _Handler]:
+        # Ein Dict-Lookup pro Nachricht statt if/elif-Kette; Depth-Parameter einmalig aus der Config
+        dispatch: Dict[str, _Handler] = {
+            "trades": self._handle_trade,
+            "l1": self._handle_l1,
+            "ob_diff": self._handle_ob_diff,
+            "liquidations": self._handle_liquidation,
+            "klines": self._handle_kline,
+        }
+        for channel_name, default_depth in (("ob_top5", 5), ("ob_top20", 20)):
+            channel_conf = self.config.channels.get(channel_name)
+            depth = (channel_conf.depth if channel_conf else None) or default_depth
             channel_enum = Channel.ob_top5 if depth == 5 else Channel.ob_top20
-            event = transforms.depth_from_snapshot(
+            dispatch[channel_name] = self._make_ob_top_handler(depth, channel_enum)
+        return dispatch
+
+    # Handler sind synchron und liefern (akzeptierte Nachrichten, Backpressure);
+    # der Receive-Loop awaited drain() nur, wenn ein Writer voll ist.
+
+    def _handle_trade(self, symbol: str, payload: dict, ts_recv_ns: int) -> Tuple[int, bool]:
+        event = trade_from_stream(symbol, payload, ts_recv_ns)
+        return 1, self.router.publish_nowait(event)
+
+    def _handle_l1(self, symbol: str, payload: dict, ts_recv_ns: int) -> Tuple[int, bool]:
+        event = l1_from_stream(symbol, payload, ts_recv_ns)
+        return 1, self._handle_depth_event(symbol, event)
+
+    def _make_ob_top_handler(self, depth: int, channel_enum: Channel) -> _Handler:
+        def handle_ob_top(symbol: str, payload: dict, ts_recv_ns: int) -> Tuple[int, bool]:
+            event = depth_from_snapshot(
                 symbol,
                 payload,
                 ts_recv_ns,
                 depth,
                 channel_enum,
             )
-            await self._handle_depth_event(symbol, event)
-            return 1
-        elif channel_name == "ob_diff":
-            event = transforms.diff_from_stream(symbol, payload, ts_recv_ns)
-            await self.router.publish(event)
-            return 1
-        elif channel_name == "liquidations":
-            event = transforms.liquidation_from_stream(symbol, payload, ts_recv_ns)
-            await self.router.publish(event)
-            return 1
-        elif channel_name == "klines":
-            event = transforms.kline_from_stream(symbol, payload, ts_recv_ns)
-            if not event.is_closed:
-                return 0
-            await self.router.publish(event)
-            return 1
-        return 0
-
-    async def _handle_depth_event(self, symbol: str, event: OrderBookDepthEvent) -> None:
-        await self.router.publish(event)
-        bid = event.bid_prices[0] if event.bid_prices else None
-        ask = event.ask_prices[0] if event.ask_prices else None
+            return 1, self._handle_depth_event(symbol, event)
+
+        return handle_ob_top
+
+    def _handle_ob_diff(self, symbol: str, payload: dict, ts_recv_ns: int) -> Tuple[int, bool]:
+        event = diff_from_stream(symbol, payload, ts_recv_ns)
+        return 1, self.router.publish_nowait(event)
+
+    def _handle_liquidation(self, symbol: str, payload: dict, ts_recv_ns: int) -> Tuple[int, bool]:
+        event = liquidation_from_stream(symbol, payload, ts_recv_ns)
+        return 1, self.router.publish_nowait(event)
+
+    def _handle_kline(self, symbol: str, payload: dict, ts_recv_ns: int) -> Tuple[int, bool]:
+        event = kline_from_stream(symbol, payload, ts_recv_ns)
+        if not event.is_closed:
+            return 0, False
+        return 1, self.router.publish_nowait(event)
+
+    def _handle_depth_event(self, symbol: str, event: OrderBookDepthEvent) -> bool:
+        bid = float(event.bid_prices[0]) if event.bid_prices else None
+        ask = float(event.ask_prices[0]) if event.ask_prices else None
         if bid is not None:
             self._best_bid[symbol] = bid
         if ask is not None:
@@ -652,17 +1171,20 @@ class BinanceFeed(ExchangeFeed):
                 "bid_qtys": event.bid_qtys,
                 "ask_qtys": event.ask_qtys,
             }
-        if self._advanced_channel and self._advanced_channel.enabled and self.has_outputs(self._advanced_channel):
-            adv_event = transforms.metrics_from_state(
+        outs: List[BaseEvent] = [event]
+        if self._advanced_enabled:
+            adv_event = metrics_from_state(
                 symbol,
                 event.ts_event_ns,
                 event.ts_recv_ns,
-                self._best_bid[symbol],
-                self._best_ask[symbol],
+                self._best_bid.get(symbol),
+                self._best_ask.get(symbol),
                 self._top5_state.get(symbol),
             )
             if adv_event:
-                await self.router.publish(adv_event)
+                outs.append(adv_event)
+        # Depth- und Metrics-Event gemeinsam: höchstens ein drain() pro Frame
+        return self.router.publish_many_nowait(outs)
 
     def _iter_streams(
         self, channel_name: str, channel_conf: ChannelConfig, symbols: List[str]
@@ -677,14 +1199,16 @@ class BinanceFeed(ExchangeFeed):
             speed_setting = str(channel_conf.extras.get("speed", "100ms"))
             if speed_setting == "100ms":
                 speed = "@100ms"
+        # Konstante Platzhalter einmal einsetzen, je Symbol bleibt nur ein str.replace
+        template = stream_template.replace("{speed}", speed)
+        if "{interval}" in template:
+            if not interval:
+                if symbols:
+                    raise ValueError(f"Kline-Stream benötigt interval für {symbols[0]}.")
+                return
+            template = template.replace("{interval}", interval)
         for symbol in symbols:
-            symbol_l = symbol.lower()
-            if "{interval}" in stream_template:
-                if not interval:
-                    raise ValueError(f"Kline-Stream benötigt interval für {symbol}.")
-                yield stream_template.format(symbol=symbol_l, interval=interval, speed=speed)
-            else:
-                yield stream_template.format(symbol=symbol_l, speed=speed)
+            yield template.replace("{symbol}", symbol.lower())
 
     def _stream_url(self, streams: List[str]) -> str:
         base_url = BASE_URLS.get(self.market_type)
@@ -698,7 +1222,8 @@ class BinanceFeed(ExchangeFeed):
         per_conn = settings.get(channel_name)
         if not per_conn:
             return [self.config.symbols]
+        per_conn = max(int(per_conn), _MIN_SYMBOLS_PER_CONN.get(channel_name, 0))
         chunks: List[List[str]] = []
-        for idx in range(0, len(self.config.symbols), int(per_conn)):
-            chunks.append(self.config.symbols[idx : idx + int(per_conn)])
+        for idx in range(0, len(self.config.symbols), per_conn):
+            chunks.append(self.config.symbols[idx : idx + per_conn])
         return chunks
@@ -16,6 +16,41 @@ from ...core.events import (
 )
 from ...utils.decimal import to_decimal
 
+# Binance liefert Preise/Mengen mit höchstens 8 Nachkommastellen → exakt als int (Wert * 10**8)
+SCALE_DIGITS = 8
+_ZERO = Decimal("0")
+
+
+def to_scaled_int(value, digits: int = SCALE_DIGITS) -> int:
+    """Parst einen Dezimal-String exakt in einen skalierten int (value * 10**digits), ohne float."""
+    if isinstance(value, str):
+        whole, _, frac = value.partition(".")
+        if len(frac) <= digits:
+            try:
+                # Vorzeichen bleibt am Ganzzahlteil: "-0.5" → int("-050000000")
+                return int(whole + frac.ljust(digits, "0"))
+            except ValueError:
+                pass  # z.B. Exponent-Schreibweise → exakter Decimal-Pfad
+    scaled = to_decimal(value).scaleb(digits)
+    if scaled != scaled.to_integral_value():
+        raise ValueError(f"Mehr als {digits} Nachkommastellen: {value!r}")
+    return int(scaled)
+
+
+def from_scaled_int(value: int, digits: int = SCALE_DIGITS) -> Decimal:
+    """Gegenstück zu to_scaled_int: erst an der Emit-Grenze zurück in Decimal.
+
+    Nachkommanullen werden abgeschnitten ("3.074" statt "3.07400000"), der Exponent bleibt
+    dabei <= 0 – ganze Zahlen also "100", nicht "1E+2" wie bei Decimal.normalize().
+    """
+    if not value:
+        return _ZERO
+    exponent = -digits
+    while exponent and not value % 10:
+        value //= 10
+        exponent += 1
+    return Decimal(value).scaleb(exponent)
+
 
 def trade_from_stream(
     symbol: str,
@@ -63,8 +98,9 @@ def depth_from_snapshot(
     depth: int,
     channel: Channel,
 ) -> OrderBookDepthEvent:
-    bids = _pairs_to_dec(payload.get("bids", []), depth)
-    asks = _pairs_to_dec(payload.get("asks", []), depth)
+    # Direkt in die vier Spaltenlisten parsen, ohne Zwischenliste aus (px, qty)-Tupeln
+    bids = payload.get("bids", [])[:depth]
+    asks = payload.get("asks", [])[:depth]
     event_ts = payload.get("E")
     ts_event_ns = int(event_ts) * 1_000_000 if event_ts is not None else ts_recv_ns
     return OrderBookDepthEvent(
@@ -73,10 +109,10 @@ def depth_from_snapshot(
         ts_event_ns=ts_event_ns,
         ts_recv_ns=ts_recv_ns,
         depth=depth,
-        bid_prices=[px for px, _ in bids],
-        bid_qtys=[qty for _, qty in bids],
-        ask_prices=[px for px, _ in asks],
-        ask_qtys=[qty for _, qty in asks],
+        bid_prices=[to_decimal(px) for px, _ in bids],
+        bid_qtys=[to_decimal(qty) for _, qty in bids],
+        ask_prices=[to_decimal(px) for px, _ in asks],
+        ask_qtys=[to_decimal(qty) for _, qty in asks],
     )
 
 
@@ -85,8 +121,8 @@ def diff_from_stream(
     payload: dict,
     ts_recv_ns: int,
 ) -> OrderBookDiffEvent:
-    bids = {to_decimal(price): to_decimal(qty) for price, qty in payload.get("b", [])}
-    asks = {to_decimal(price): to_decimal(qty) for price, qty in payload.get("a", [])}
+    bids = payload.get("b", [])
+    asks = payload.get("a", [])
     return OrderBookDiffEvent(
         instrument=symbol,
         channel=Channel.ob_diff,
@@ -94,8 +130,10 @@ def diff_from_stream(
         ts_recv_ns=ts_recv_ns,
         sequence=int(payload["u"]),
         prev_sequence=int(payload["U"]),
-        bids=bids,
-        asks=asks,
+        bid_prices=[to_decimal(px) for px, _ in bids],
+        bid_qtys=[to_decimal(qty) for _, qty in bids],
+        ask_prices=[to_decimal(px) for px, _ in asks],
+        ask_qtys=[to_decimal(qty) for _, qty in asks],
     )
 
 
@@ -177,22 +215,24 @@ def metrics_from_state(
     symbol: str,
     ts_event_ns: int,
     ts_recv_ns: int,
-    best_bid: Optional[Decimal],
-    best_ask: Optional[Decimal],
+    best_bid: Optional[float],
+    best_ask: Optional[float],
     top5: Optional[Dict[str, List[Decimal]]] = None,
 ) -> Optional[AdvancedMetricsEvent]:
+    # Abgeleitete Kennzahlen in float64: ausreichend genau, ohne Decimal-Arithmetik pro Depth-Frame
     if best_bid is None or best_ask is None:
         return None
-    spread = best_ask - best_bid
-    mid = (best_ask + best_bid) / Decimal("2")
-    metrics: Dict[str, Decimal] = {
+    # Binance-Preise haben höchstens 8 Nachkommastellen → Rundung entfernt float-Artefakte
+    spread = round(best_ask - best_bid, 10)
+    mid = round((best_ask + best_bid) * 0.5, 10)
+    metrics: Dict[str, float] = {
         "spread_px": spread,
         "mid_px": mid,
-        "spread_bps": (spread / mid * Decimal("10000")) if mid > 0 else Decimal("0"),
+        "spread_bps": (spread / mid * 10_000.0) if mid > 0 else 0.0,
     }
     if top5:
-        bid_qty_total = sum(top5.get("bid_qtys", []))
-        ask_qty_total = sum(top5.get("ask_qtys", []))
+        bid_qty_total = float(sum(top5.get("bid_qtys", ())))
+        ask_qty_total = float(sum(top5.get("ask_qtys", ())))
         total = bid_qty_total + ask_qty_total
         if total > 0:
             metrics["imbalance_5"] = (bid_qty_total - ask_qty_total) / total
@@ -203,13 +243,3 @@ def metrics_from_state(
         ts_recv_ns=ts_recv_ns,
         metrics=metrics,
     )
-
-
-def _pairs_to_dec(
-    entries: List[List[str]],
-    depth: int,
-) -> List[tuple[Decimal, Decimal]]:
-    result = []
-    for price_str, qty_str in entries[:depth]:
-        result.append((to_decimal(price_str), to_decimal(qty_str)))
-    return result
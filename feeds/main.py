@@ -10,8 +10,10 @@ if __package__ in (None, ""):
     # Als Skript ausgeführt: Projektwurzel zum Pfad hinzufügen.
     sys.path.append(str(Path(__file__).resolve().parent.parent))
     from feeds import FeedOrchestrator, load_config  # type: ignore
+    from feeds.utils import install_uvloop  # type: ignore
 else:
     from . import FeedOrchestrator, load_config
+    from .utils import install_uvloop
 
 
 async def _run(config_path: str) -> None:
@@ -33,6 +35,7 @@ def main() -> None:
     parser = argparse.ArgumentParser(description="Universal Feed Starter")
     parser.add_argument("--config", required=True, help="Pfad zur feeds.yaml")
     args = parser.parse_args()
+    install_uvloop()
     asyncio.run(_run(args.config))
 
 
@@ -11,6 +11,11 @@ try:
 except ImportError:  # pragma: no cover
     Redis = None  # type: ignore
 
+try:
+    from redis.asyncio.cluster import RedisCluster  # type: ignore
+except ImportError:  # pragma: no cover
+    RedisCluster = None  # type: ignore
+
 from .config import AppConfig
 from .core.events import Channel
 from .core.router import PipelineRouter
@@ -66,7 +71,12 @@ class FeedOrchestrator:
         if required_targets.get("redis") and defaults.enable_redis:
             if Redis is None:
                 raise RuntimeError("redis-py nicht installiert.")
-            self._redis_client = Redis.from_url(defaults.redis.dsn)
+            if defaults.redis.cluster:
+                if RedisCluster is None:
+                    raise RuntimeError("redis-py ohne Cluster-Unterstuetzung installiert.")
+                self._redis_client = RedisCluster.from_url(defaults.redis.dsn)
+            else:
+                self._redis_client = Redis.from_url(defaults.redis.dsn)
             self._redis_writer = RedisWriter(
                 self._redis_client,
                 pipeline_size=defaults.redis.pipeline_size,
@@ -8,6 +8,11 @@ from typing import Dict, List, Optional, Tuple
 
 import httpx
 
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
 from ..core.events import (
     AdvancedMetricsEvent,
     AggTrade5sEvent,
@@ -40,53 +45,50 @@ class ClickHouseWriter(EventWriter):
         self._database = database
         self._batch_rows = batch_rows
         self._compression = compression
-        self._buffer: Dict[str, List[Dict[str, object]]] = {}
-        self._buffer_lock = asyncio.Lock()
+        # Puffer wird nur synchron (ohne await dazwischen) verändert → kein Lock nötig im Event-Loop.
+        # Zeilen liegen bereits als JSONEachRow-bytes vor; der Flush verbindet sie nur noch.
+        self._buffer: Dict[str, List[bytes]] = {}
         self._rows_by_table: Dict[str, int] = {}
         self._flushed_by_table: Dict[str, int] = {}
         self._flush_errors = 0
         self._pending_tasks: set[asyncio.Task] = set()
         self._flush_sem = asyncio.Semaphore(4)
 
-    async def enqueue(self, event: BaseEvent) -> None:
+    def enqueue(self, event: BaseEvent) -> bool:
         row = self._event_to_row(event)
         if row is None:
-            return
+            return False
         table, data = row
         self._record_event(1)
         self._rows_by_table[table] = self._rows_by_table.get(table, 0) + 1
-        rows_to_flush: Optional[List[Dict[str, object]]] = None
-        async with self._buffer_lock:
-            bucket = self._buffer.setdefault(table, [])
-            bucket.append(data)
-            if len(bucket) >= self._batch_rows:
-                rows_to_flush = bucket[:]
-                self._buffer[table] = []
-        if rows_to_flush:
-            self._schedule_flush(table, rows_to_flush)
+        bucket = self._buffer.setdefault(table, [])
+        bucket.append(_encode_row(data))
+        if len(bucket) >= self._batch_rows:
+            # Volle Batches gehen als eigener Task raus, daher nie Backpressure an den Aufrufer
+            self._buffer[table] = []
+            self._schedule_flush(table, bucket)
+        return False
+
+    def has_pending(self) -> bool:
+        return any(self._buffer.values())
 
     async def flush(self) -> None:
-        to_flush: List[Tuple[str, List[Dict[str, object]]]] = []
-        async with self._buffer_lock:
-            for table in list(self._buffer.keys()):
-                if self._buffer[table]:
-                    rows = self._buffer[table][:]
-                    self._buffer[table] = []
-                    to_flush.append((table, rows))
+        to_flush = [(table, rows) for table, rows in self._buffer.items() if rows]
         for table, rows in to_flush:
+            self._buffer[table] = []
             self._schedule_flush(table, rows)
 
-    def _schedule_flush(self, table: str, rows: List[Dict[str, object]]) -> None:
+    def _schedule_flush(self, table: str, rows: List[bytes]) -> None:
         task = asyncio.create_task(self._flush_rows(table, rows))
         self._pending_tasks.add(task)
         task.add_done_callback(self._pending_tasks.discard)
 
-    async def _flush_rows(self, table: str, rows: List[Dict[str, object]]) -> None:
+    async def _flush_rows(self, table: str, rows: List[bytes]) -> None:
         if not rows:
             return
         async with self._flush_sem:
             row_count = len(rows)
-            payload = "\n".join(json.dumps(row, default=_json_default) for row in rows)
+            payload = b"\n".join(rows)
             query = f"INSERT INTO {self._database}.{table} FORMAT JSONEachRow"
             headers = {}
             if self._compression:
@@ -95,15 +97,14 @@ class ClickHouseWriter(EventWriter):
                 response = await self._client.post(
                     "/",
                     params={"query": query},
-                    content=payload.encode("utf-8"),
+                    content=payload,
                     headers=headers,
                 )
                 response.raise_for_status()
             except Exception as exc:
                 self._flush_errors += 1
                 logging.warning("CH flush failed table=%s rows=%s error=%s", table, row_count, exc)
-                async with self._buffer_lock:
-                    self._buffer.setdefault(table, []).extend(rows)
+                self._buffer.setdefault(table, []).extend(rows)
             else:
                 self._record_flush(row_count)
                 self._flushed_by_table[table] = self._flushed_by_table.get(table, 0) + row_count
@@ -129,8 +130,8 @@ class ClickHouseWriter(EventWriter):
         if isinstance(event, TradeEvent):
             data = {
                 **common,
-                "price": to_decimal(event.price),
-                "qty": to_decimal(event.qty),
+                "price": event.price,
+                "qty": event.qty,
                 "side": event.side,
                 "trade_id": event.trade_id,
                 "is_aggressor": event.is_aggressor,
@@ -141,43 +142,47 @@ class ClickHouseWriter(EventWriter):
                 **common,
                 "interval_s": event.interval_s,
                 "window_start_ns": event.window_start_ns,
-                "open": to_decimal(event.open),
-                "high": to_decimal(event.high),
-                "low": to_decimal(event.low),
-                "close": to_decimal(event.close),
-                "volume": to_decimal(event.volume),
-                "notional": to_decimal(event.notional),
+                "open": event.open,
+                "high": event.high,
+                "low": event.low,
+                "close": event.close,
+                "volume": event.volume,
+                "notional": event.notional,
                 "trade_count": event.trade_count,
-                "buy_qty": to_decimal(event.buy_qty),
-                "sell_qty": to_decimal(event.sell_qty),
-                "buy_notional": to_decimal(event.buy_notional),
-                "sell_notional": to_decimal(event.sell_notional),
+                "buy_qty": event.buy_qty,
+                "sell_qty": event.sell_qty,
+                "buy_notional": event.buy_notional,
+                "sell_notional": event.sell_notional,
                 "first_trade_id": event.first_trade_id,
                 "last_trade_id": event.last_trade_id,
             }
-            return "agg_trades_5s", data
+            return ("agg_trades_rollup" if event.rollup else "agg_trades_5s"), data
         if isinstance(event, OrderBookDepthEvent):
-            data = {**common, "depth": event.depth}
-            data["bid_prices"] = [to_decimal(px) for px in event.bid_prices]
-            data["bid_qtys"] = [to_decimal(qty) for qty in event.bid_qtys]
-            data["ask_prices"] = [to_decimal(px) for px in event.ask_prices]
-            data["ask_qtys"] = [to_decimal(qty) for qty in event.ask_qtys]
+            # Levels sind bereits Decimal (Transforms) → Listen ohne Kopie übernehmen
+            data = {
+                **common,
+                "depth": event.depth,
+                "bid_prices": event.bid_prices,
+                "bid_qtys": event.bid_qtys,
+                "ask_prices": event.ask_prices,
+                "ask_qtys": event.ask_qtys,
+            }
             return self._depth_table(event.channel), data
         if isinstance(event, OrderBookDiffEvent):
             data = {
                 **common,
                 "sequence": event.sequence,
                 "prev_sequence": event.prev_sequence,
-                "bids": {str(to_decimal(px)): str(to_decimal(qty)) for px, qty in event.bids.items()},
-                "asks": {str(to_decimal(px)): str(to_decimal(qty)) for px, qty in event.asks.items()},
+                "bids": dict(zip(map(str, event.bid_prices), map(str, event.bid_qtys))),
+                "asks": dict(zip(map(str, event.ask_prices), map(str, event.ask_qtys))),
             }
             return "order_book_diffs", data
         if isinstance(event, LiquidationEvent):
             data = {
                 **common,
                 "side": event.side,
-                "price": to_decimal(event.price),
-                "qty": to_decimal(event.qty),
+                "price": event.price,
+                "qty": event.qty,
                 "order_id": event.order_id,
                 "reason": event.reason,
             }
@@ -185,20 +190,21 @@ class ClickHouseWriter(EventWriter):
         if isinstance(event, MarkPriceEvent):
             data = {
                 **common,
-                "mark_price": to_decimal(event.mark_price),
-                "index_price": to_decimal(event.index_price) if event.index_price is not None else None,
+                "mark_price": event.mark_price,
+                "index_price": event.index_price,
             }
             return "mark_price", data
         if isinstance(event, FundingEvent):
             data = {
                 **common,
-                "funding_rate": to_decimal(event.funding_rate),
+                "funding_rate": event.funding_rate,
                 "next_funding_ts_ns": event.next_funding_ts_ns,
             }
             return "funding", data
         if isinstance(event, AdvancedMetricsEvent):
             data = {
                 **common,
+                # Einzige Konvertierung: Metrics sind float, alle übrigen Felder schon Decimal
                 "metrics": {name: to_decimal(value) for name, value in event.metrics.items()},
             }
             return "advanced_metrics", data
@@ -206,14 +212,14 @@ class ClickHouseWriter(EventWriter):
             data = {
                 **common,
                 "interval": event.interval,
-                "open": to_decimal(event.open),
-                "high": to_decimal(event.high),
-                "low": to_decimal(event.low),
-                "close": to_decimal(event.close),
-                "volume": to_decimal(event.volume),
-                "quote_volume": to_decimal(event.quote_volume),
-                "taker_buy_base_volume": to_decimal(event.taker_buy_base_volume),
-                "taker_buy_quote_volume": to_decimal(event.taker_buy_quote_volume),
+                "open": event.open,
+                "high": event.high,
+                "low": event.low,
+                "close": event.close,
+                "volume": event.volume,
+                "quote_volume": event.quote_volume,
+                "taker_buy_base_volume": event.taker_buy_base_volume,
+                "taker_buy_quote_volume": event.taker_buy_quote_volume,
                 "trade_count": event.trade_count,
                 "is_closed": event.is_closed,
             }
@@ -230,6 +236,13 @@ class ClickHouseWriter(EventWriter):
         return "order_book_depth"
 
 
+def _encode_row(row: Dict[str, object]) -> bytes:
+    # Eine JSONEachRow-Zeile; orjson liefert direkt bytes (ohne str-Zwischenschritt), sonst stdlib json
+    if orjson is not None:
+        return orjson.dumps(row, default=_json_default)
+    return json.dumps(row, default=_json_default).encode("utf-8")
+
+
 def _json_default(value):
     if isinstance(value, Decimal):
         return str(value)
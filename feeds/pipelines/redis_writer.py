@@ -5,7 +5,7 @@ Redis Sink fuer Live-Trading-Lesezugriffe.
 
 TTL-Policy (bewusst kurz fuer "letzter Stand"):
 - mark_price: 3 Sekunden
-- agg_trades_5s: 10 Sekunden
+- agg_trades_5s: 10 Sekunden (Rollup-Bars: zwei Fensterlängen)
 - klines: 120 Sekunden (2 Minuten)
 
 Hinweis:
@@ -13,6 +13,7 @@ Hinweis:
 - Streams (trades/liquidations) bleiben ueber MAXLEN begrenzt und nutzen kein TTL.
 """
 
+import asyncio
 from dataclasses import dataclass
 from decimal import Decimal
 from typing import Any, Dict, List, Optional
@@ -43,7 +44,6 @@ class RedisCommand:
     name: str
     key: str
     payload: Optional[Dict[str, str]] = None
-    maxlen: Optional[int] = None
     ttl_s: Optional[int] = None
     channel: Optional[str] = None
     count_for_channel: bool = False
@@ -71,50 +71,67 @@ class RedisWriter(EventWriter):
         self._buffer: List[RedisCommand] = []
         self._events_by_channel: Dict[str, int] = {}
         self._flushed_by_channel: Dict[str, int] = {}
+        # Auto-Flush und drain_if_full() koennen gleichzeitig feuern; nur ein Flush darf senden
+        self._flush_lock = asyncio.Lock()
 
-    async def enqueue(self, event: BaseEvent) -> None:
+    def enqueue(self, event: BaseEvent) -> bool:
         channel, commands = self._build_commands(event)
         if not commands:
-            return
+            return False
         self._record_event(len(commands))
         self._events_by_channel[channel] = self._events_by_channel.get(channel, 0) + 1
-        for command in commands:
-            self._buffer.append(command)
+        self._buffer.extend(commands)
+        if len(self._buffer) >= self._pipeline_size:
+            self._signal_flush()
+            return True
+        return False
+
+    async def drain_if_full(self) -> None:
         if len(self._buffer) >= self._pipeline_size:
             await self.flush()
 
+    def has_pending(self) -> bool:
+        return bool(self._buffer)
+
     async def flush(self) -> None:
-        if not self._buffer:
-            return
-        buffered = len(self._buffer)
-        pipe = self._client.pipeline(transaction=False)
-        flushed_by_channel_delta: Dict[str, int] = {}
-        try:
-            for command in self._buffer:
-                if command.name == "hset":
-                    await pipe.hset(command.key, mapping=command.payload or {})
-                elif command.name == "xadd":
-                    await pipe.xadd(
-                        command.key,
-                        command.payload or {},
-                        maxlen=command.maxlen,
-                        approximate=True,
-                    )
-                elif command.name == "expire":
-                    if command.ttl_s is None:
-                        continue
-                    await pipe.expire(command.key, command.ttl_s)
-                if command.count_for_channel and command.channel:
-                    flushed_by_channel_delta[command.channel] = (
-                        flushed_by_channel_delta.get(command.channel, 0) + 1
-                    )
-            await pipe.execute()
-        finally:
-            await pipe.aclose()
-            self._buffer.clear()
-            self._record_flush(buffered)
-            for channel, count in flushed_by_channel_delta.items():
-                self._flushed_by_channel[channel] = self._flushed_by_channel.get(channel, 0) + count
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            # Puffer vor dem ersten await uebernehmen: waehrend execute() eingereihte
+            # Kommandos landen im neuen Puffer und gehen mit dem naechsten Flush raus
+            commands, self._buffer = self._buffer, []
+            buffered = len(commands)
+            stream_maxlen = self._stream_maxlen
+            flushed_by_channel_delta: Dict[str, int] = {}
+            # Ein Round-Trip fuer den ganzen Puffer: Kommandos werden im Pipeline-Objekt nur
+            # gesammelt (kein await je Kommando), erst execute() spricht mit Redis.
+            # Im Cluster-Modus verteilt die ClusterPipeline die Kommandos selbst je Slot.
+            try:
+                async with self._client.pipeline(transaction=False) as pipe:
+                    for command in commands:
+                        if command.name == "hset":
+                            pipe.hset(command.key, mapping=command.payload or {})
+                        elif command.name == "xadd":
+                            # XADD ... MAXLEN ~ N: Trimmen im selben Kommando, kein eigener XTRIM-Round-Trip
+                            pipe.xadd(
+                                command.key,
+                                command.payload or {},
+                                maxlen=stream_maxlen,
+                                approximate=True,
+                            )
+                        elif command.name == "expire":
+                            if command.ttl_s is None:
+                                continue
+                            pipe.expire(command.key, command.ttl_s)
+                        if command.count_for_channel and command.channel:
+                            flushed_by_channel_delta[command.channel] = (
+                                flushed_by_channel_delta.get(command.channel, 0) + 1
+                            )
+                    await pipe.execute()
+            finally:
+                self._record_flush(buffered)
+                for channel, count in flushed_by_channel_delta.items():
+                    self._flushed_by_channel[channel] = self._flushed_by_channel.get(channel, 0) + count
 
     def stats(self) -> dict:
         base = super().stats()
@@ -136,9 +153,13 @@ class RedisWriter(EventWriter):
         if isinstance(event, FundingEvent):
             return Channel.funding.value, [self._build_funding_command(event)]
         if isinstance(event, AggTrade5sEvent):
+            # Rollup-Hash lebt zwei Fensterlängen, sonst wäre z.B. die 1m-Bar die meiste Zeit weg
+            ttl_s = self.AGG_TRADES_5S_TTL_S
+            if event.rollup:
+                ttl_s = max(ttl_s, 2 * event.interval_s)
             return Channel.agg_trades_5s.value, self._with_ttl(
                 self._build_agg_trades_5s_command(event),
-                self.AGG_TRADES_5S_TTL_S,
+                ttl_s,
                 Channel.agg_trades_5s.value,
             )
         if isinstance(event, KlineEvent):
@@ -178,7 +199,6 @@ class RedisWriter(EventWriter):
             "xadd",
             key,
             payload,
-            maxlen=self._stream_maxlen,
             channel=Channel.trades.value,
             count_for_channel=True,
         )
@@ -239,7 +259,12 @@ class RedisWriter(EventWriter):
         )
 
     def _build_agg_trades_5s_command(self, event: AggTrade5sEvent) -> RedisCommand:
-        key = self._key("last:agg_trades_5s", event.instrument)
+        # Basis-Bar bleibt auf dem bisherigen Key (unabhängig von interval_s); Rollup-Bars
+        # (z.B. 60s) bekommen je Fensterlänge einen eigenen Hash
+        if event.rollup:
+            key = self._key("last:agg_trades_rollup", f"{event.interval_s}s", event.instrument)
+        else:
+            key = self._key("last:agg_trades_5s", event.instrument)
         payload = {
             "ts_event_ns": str(event.ts_event_ns),
             "ts_recv_ns": str(event.ts_recv_ns),
@@ -327,7 +352,6 @@ class RedisWriter(EventWriter):
             "xadd",
             key,
             payload,
-            maxlen=self._stream_maxlen,
             channel=Channel.liquidations.value,
             count_for_channel=True,
         )
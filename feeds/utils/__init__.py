@@ -1,4 +1,5 @@
 from .time import now_ns
 from .decimal import to_decimal
+from .loop import install_uvloop
 
-__all__ = ["now_ns", "to_decimal"]
+__all__ = ["now_ns", "to_decimal", "install_uvloop"]
@@ -7,8 +7,11 @@ getcontext().prec = 38
 
 def to_decimal(value) -> Decimal:
     """Konvertiert Zahlen sicher in Decimal."""
+    if isinstance(value, str):
+        # Häufigster Fall (Exchange-JSON): direkt parsen, ohne str()-Umweg
+        return Decimal(value)
     if isinstance(value, Decimal):
         return value
-    if isinstance(value, (int, float, str)):
+    if isinstance(value, (int, float)):
         return Decimal(str(value))
     raise TypeError(f"Kann Wert nicht in Decimal umwandeln: {type(value)!r}")
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+
+
+def install_uvloop() -> bool:
+    """uvloop als Event-Loop-Policy setzen, falls installiert (nicht unter Windows verfügbar).
+
+    Mit FEEDS_UVLOOP=0 abschaltbar, z.B. wenn eine Host-Anwendung ihren eigenen Loop vorgibt.
+    """
+    if os.getenv("FEEDS_UVLOOP", "1").strip().lower() in {"0", "false", "no", "off"}:
+        return False
+    try:
+        import uvloop  # type: ignore
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    logging.getLogger("feeds").debug("uvloop event loop policy aktiv")
+    return True
@@ -21,10 +21,12 @@ if __package__ in (None, ""):
     from feeds import FeedOrchestrator, load_config  # type: ignore
     from feeds.config import ChannelConfig, ExchangeConfig, OutputTargets  # type: ignore
     from feeds.exchanges.binance.capabilities import SUPPORTED_CHANNELS  # type: ignore
+    from feeds.utils import install_uvloop  # type: ignore
 else:
     from feeds import FeedOrchestrator, load_config
     from feeds.config import ChannelConfig, ExchangeConfig, OutputTargets
     from feeds.exchanges.binance.capabilities import SUPPORTED_CHANNELS
+    from feeds.utils import install_uvloop
 
 
 PRESETS_PATH = Path("feeds/presets.json")
@@ -476,6 +478,7 @@ def _run_preset_process(preset_id: str, core_idx: Optional[int], output_mode: st
     _configure_logging(preset_label)
     _set_cpu_affinity(core_idx)
     logging.info("Start preset=%s output_mode=%s", preset_label, output_mode)
+    install_uvloop()
     try:
         asyncio.run(run_preset(preset, output_mode=output_mode))
     except KeyboardInterrupt:
@@ -523,6 +526,7 @@ def main() -> None:
         preset_label = _preset_label(preset, output_mode)
         _configure_logging(preset_label)
         _set_cpu_affinity(None)
+        install_uvloop()
         try:
             asyncio.run(run_preset(preset, output_mode=output_mode))
         except KeyboardInterrupt:
@@ -998,6 +1002,7 @@ async def _log_stats(
         disc_counts: dict[str, int] = {}
         parse_errors: dict[str, int] = {}
         validation_errors: dict[str, int] = {}
+        rollup_counts: dict[str, int] = {}
         for feed in stats.get("feeds", []):
             for channel, count in feed.get("ws_msgs", {}).items():
                 ws_counts[channel] = ws_counts.get(channel, 0) + count
@@ -1007,8 +1012,15 @@ async def _log_stats(
                 parse_errors[channel] = parse_errors.get(channel, 0) + count
             for channel, count in feed.get("validation_errors", {}).items():
                 validation_errors[channel] = validation_errors.get(channel, 0) + count
-
-        router_counts = stats.get("router", {}).get("events_by_channel", {})
+            for channel, count in feed.get("rollup_bars", {}).items():
+                rollup_counts[channel] = rollup_counts.get(channel, 0) + count
+
+        # Rollup-Bars (agg_trades_5s extras.rollups) laufen unter dem Basis-Channel durch
+        # Router und Writer, haben aber keinen ws-Frame → für Health/Diff herausrechnen
+        router_counts = {
+            channel: count - rollup_counts.get(channel, 0)
+            for channel, count in stats.get("router", {}).get("events_by_channel", {}).items()
+        }
         clickhouse_stats = stats.get("clickhouse") or {}
         redis_stats = stats.get("redis") or {}
         table_counts = clickhouse_stats.get("rows_by_table", {})
@@ -1020,8 +1032,13 @@ async def _log_stats(
         def _writer_counts(channel: str) -> tuple[int, int]:
             table = channel_to_table.get(channel)
             if table and (table in table_counts or table in flushed_counts):
+                # ClickHouse schreibt Rollup-Bars in eine eigene Tabelle (agg_trades_rollup)
                 return int(table_counts.get(table, 0)), int(flushed_counts.get(table, 0))
-            return int(redis_channel_counts.get(channel, 0)), int(redis_flushed_by_channel.get(channel, 0))
+            rolled = rollup_counts.get(channel, 0)
+            return (
+                int(redis_channel_counts.get(channel, 0)) - rolled,
+                int(redis_flushed_by_channel.get(channel, 0)) - rolled,
+            )
 
         diff_lines = []
         channels = sorted(set(ws_counts) | set(router_counts) | set(redis_channel_counts))
@@ -95,6 +95,23 @@ def build_schema_sql(database: str) -> Iterable[Tuple[str, str]]:
         PARTITION BY toYYYYMM(event_time)
         ORDER BY (instrument, ts_event_ns)
     """
+    agg_trade_columns = """
+        interval_s UInt16,
+        window_start_ns UInt64,
+        open Decimal(38, 18),
+        high Decimal(38, 18),
+        low Decimal(38, 18),
+        close Decimal(38, 18),
+        volume Decimal(38, 18),
+        notional Decimal(38, 18),
+        trade_count UInt32,
+        buy_qty Decimal(38, 18),
+        sell_qty Decimal(38, 18),
+        buy_notional Decimal(38, 18),
+        sell_notional Decimal(38, 18),
+        first_trade_id Nullable(String),
+        last_trade_id Nullable(String)
+    """
 
     tables = {
         "trades": f"""
@@ -111,24 +128,21 @@ def build_schema_sql(database: str) -> Iterable[Tuple[str, str]]:
         "agg_trades_5s": f"""
             CREATE TABLE IF NOT EXISTS {database}.agg_trades_5s (
                 {common},
-                interval_s UInt16,
-                window_start_ns UInt64,
-                open Decimal(38, 18),
-                high Decimal(38, 18),
-                low Decimal(38, 18),
-                close Decimal(38, 18),
-                volume Decimal(38, 18),
-                notional Decimal(38, 18),
-                trade_count UInt32,
-                buy_qty Decimal(38, 18),
-                sell_qty Decimal(38, 18),
-                buy_notional Decimal(38, 18),
-                sell_notional Decimal(38, 18),
-                first_trade_id Nullable(String),
-                last_trade_id Nullable(String)
+                {agg_trade_columns}
             )
             {engine}
         """,
+        # Gröbere Bars aus extras.rollups (1m, 5m, ...) – getrennt, damit agg_trades_5s
+        # nur Basis-Bars enthält (Vollständigkeits-Checks, Leser ohne interval_s-Filter)
+        "agg_trades_rollup": f"""
+            CREATE TABLE IF NOT EXISTS {database}.agg_trades_rollup (
+                {common},
+                {agg_trade_columns}
+            )
+            ENGINE = MergeTree
+            PARTITION BY toYYYYMM(event_time)
+            ORDER BY (instrument, interval_s, ts_event_ns)
+        """,
         "l1": f"""
             CREATE TABLE IF NOT EXISTS {database}.l1 (
                 {common},